@@ -1,4 +1,5 @@
 # Minecraft Stack Package
+from .config import StackConfig
 from .minecraft_stack import MinecraftStack
 
-__all__ = ['MinecraftStack']
+__all__ = ['MinecraftStack', 'StackConfig']
@@ -0,0 +1,75 @@
+import os
+from dataclasses import dataclass
+from typing import Optional
+
+
+def _split_csv(value: str) -> tuple[str, ...]:
+    """カンマ区切りの文字列をタプルに変換"""
+    return tuple(value.split(","))
+
+
+# フィールド名, 環境変数名, デフォルト値（Noneは未指定）, 型変換関数
+_FIELD_SPECS = (
+    ("project_name", "PROJECT_NAME", "minecraft-mcp", str),
+    ("env_name", "ENVIRONMENT", "dev", str),
+    ("aws_region", "AWS_REGION", "ap-northeast-1", str),
+    ("vpc_cidr", "VPC_CIDR", "10.1.0.0/16", str),
+    ("availability_zone", "AWS_AVAILABILITY_ZONES", "ap-northeast-1a", str),
+    # 注意: セキュリティグループでMy IP制限が自動適用されます
+    ("allowed_ips", "ALLOWED_IPS", "0.0.0.0/0", _split_csv),
+    ("my_ip", "MY_IP", "", str),
+    ("ssh_public_key_path", "SSH_PUBLIC_KEY_PATH", "~/.ssh/minecraft-proxy-key.pub", str),
+    ("task_name", "TASK_NAME", None, str),  # 未指定時は "<PROJECT_NAME>-task"
+    ("cpu", "ECS_CPU", "2048", int),
+    ("memory", "ECS_MEMORY", "8192", int),
+    ("container_memory", "CONTAINER_MEMORY", "8192", int),
+    ("container_memory_reservation", "CONTAINER_MEMORY_RESERVATION", "4096", int),
+    ("java_memory_heap", "JAVA_MEMORY_HEAP", "6G", str),
+    ("rcon_password", "RCON_PASSWORD", None, str),
+    ("minecraft_version", "MINECRAFT_VERSION", "1.21.8", str),
+    ("docker_image", "DOCKER_IMAGE", None, str),  # 未指定の場合はNone
+    ("profile", "PROFILE", "full", str),  # dev | prod | full
+)
+
+# 利用可能なプロファイル
+PROFILES = ("dev", "prod", "full")
+
+
+@dataclass(frozen=True, slots=True)
+class StackConfig:
+    """環境変数から読み込んだスタック設定"""
+    project_name: str
+    env_name: str
+    aws_region: str
+    vpc_cidr: str
+    availability_zone: str
+    allowed_ips: tuple[str, ...]
+    my_ip: str
+    ssh_public_key_path: str
+    task_name: str
+    cpu: int
+    memory: int
+    container_memory: int
+    container_memory_reservation: int
+    java_memory_heap: str
+    rcon_password: str
+    minecraft_version: str
+    docker_image: Optional[str]
+    profile: str
+    
+    @classmethod
+    def from_env(cls) -> "StackConfig":
+        """環境変数を読み込み、型変換と検証を行う"""
+        values = {}
+        for field, env_key, default, convert in _FIELD_SPECS:
+            raw = os.getenv(env_key, default)
+            values[field] = convert(raw) if raw is not None else None
+        
+        if not values["task_name"]:
+            values["task_name"] = f"{values['project_name']}-task"
+        if not values["rcon_password"]:
+            raise ValueError("RCON_PASSWORD environment variable is required")
+        if values["profile"] not in PROFILES:
+            raise ValueError(f"PROFILE must be one of {', '.join(PROFILES)}: {values['profile']}")
+        
+        return cls(**values)
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+from typing import Mapping
 from aws_cdk import (
     aws_ec2 as ec2,
     aws_iam as iam,
@@ -6,23 +8,42 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+# プロキシインスタンスのユーザーデータ（シバンは先頭行に置く）
+_USER_DATA_TEXT = (
+    "#!/bin/bash\n"
+    "yum update -y\n"
+    "yum install -y htop\n"
+    'echo "EC2 proxy instance ready for Session Manager port forwarding"\n'
+)
+
 
 class EC2ProxyStack(Construct):
     """EC2プロキシリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("EC2InstanceId", lambda s: s.instance.instance_id),
+        ("ElasticIP", lambda s: s.eip.ref),
+        ("KeyPairName", lambda s: s.key_pair.key_pair_name),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
                  project_name: str, environment: str, vpc: ec2.Vpc,
-                 security_group: ec2.SecurityGroup, common_tags: dict = None, **kwargs) -> None:
+                 security_group: ec2.SecurityGroup,
+                 key_pair_name: str, instance_name: str, eip_name: str, common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         self.project_name = project_name
         self.environment = environment
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
         
         # キーペア
         self.key_pair = ec2.KeyPair(
             self, "MinecraftProxyKeyPair",
-            key_pair_name=f"{project_name}-proxy-key"
+            key_pair_name=key_pair_name
         )
         
         # IAMロール
@@ -43,25 +64,20 @@ class EC2ProxyStack(Construct):
         # EC2インスタンス
         self.instance = ec2.Instance(
             self, "MinecraftProxy",
+            # NameタグはInstance自身が付与する（スコープのタグより優先されるため、ここで指定する）
+            instance_name=instance_name,
             vpc=vpc,
             instance_type=ec2.InstanceType.of(ec2.InstanceClass.T3, ec2.InstanceSize.MICRO),
             machine_image=ec2.MachineImage.latest_amazon_linux2(),
             security_group=security_group,
             key_pair=self.key_pair,
             role=self.ec2_role,
-            user_data=ec2.UserData.custom("""
-#!/bin/bash
-yum update -y
-yum install -y htop
-echo "EC2 proxy instance ready for Session Manager port forwarding"
-            """)
+            user_data=ec2.UserData.custom(_USER_DATA_TEXT)
         )
         
-        # インスタンスにタグを追加（統一されたタグ）
-        for key, value in self.common_tags.items():
-            Tags.of(self.instance).add(key, value)
-        Tags.of(self.instance).add("Name", f"{project_name}-proxy")
-        Tags.of(self.instance).add("ResourceType", "minecraft-proxy")
+        # プロキシ固有のタグをスコープ全体に一括適用（共通タグはMinecraftStackで一括適用）
+        # Elastic IPは下記のインラインタグで個別に名前を付ける
+        Tags.of(self).add("ResourceType", "minecraft-proxy", exclude_resource_types=["AWS::EC2::EIP"])
         
         # Elastic IP
         self.eip = ec2.CfnEIP(
@@ -69,7 +85,7 @@ echo "EC2 proxy instance ready for Session Manager port forwarding"
             instance_id=self.instance.instance_id,
             domain="vpc",
             tags=[
-                {"key": "Name", "value": f"{project_name}-proxy-eip"},
+                {"key": "Name", "value": eip_name},
                 {"key": "Environment", "value": environment},
                 {"key": "Project", "value": project_name}
             ]
@@ -80,20 +96,5 @@ echo "EC2 proxy instance ready for Session Manager port forwarding"
     
     def _create_outputs(self):
         """出力値の作成"""
-        CfnOutput(
-            self, "EC2InstanceId",
-            value=self.instance.instance_id,
-            description="EC2 Instance ID"
-        )
-        
-        CfnOutput(
-            self, "ElasticIP",
-            value=self.eip.ref,
-            description="Elastic IP"
-        )
-        
-        CfnOutput(
-            self, "KeyPairName",
-            value=self.key_pair.key_pair_name,
-            description="Key Pair Name"
-        )
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
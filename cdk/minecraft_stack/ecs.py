@@ -1,6 +1,10 @@
+import re
+from types import MappingProxyType
+from typing import Mapping
 from aws_cdk import (
     aws_ecs as ecs,
     aws_ec2 as ec2,
+    aws_ecr as ecr,
     aws_iam as iam,
     aws_logs as logs,
     aws_efs as efs,
@@ -11,27 +15,83 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+# ECRイメージURI: <account>.dkr.ecr.<region>.amazonaws.com[.cn]/<repository>[:<tag>|@<digest>]
+_ECR_IMAGE_URI = re.compile(
+    r"^(?P<account>\d{12})\.dkr\.ecr\.(?P<region>[a-z0-9-]+)\.amazonaws\.com(?P<cn>\.cn)?/"
+    r"(?P<repository>[^:@]+)(?:[:@](?P<tag>.+))?$"
+)
+
+# ログ保持日数 -> RetentionDays（未定義の日数は1か月）
+_RETENTION = {
+    1: logs.RetentionDays.ONE_DAY,
+    7: logs.RetentionDays.ONE_WEEK,
+    30: logs.RetentionDays.ONE_MONTH,
+    90: logs.RetentionDays.THREE_MONTHS
+}
+
+# タスク実行ロールに付与するECRアクセス用のアクション
+_ECR_ACTIONS = (
+    "ecr:GetAuthorizationToken",
+    "ecr:BatchCheckLayerAvailability",
+    "ecr:GetDownloadUrlForLayer",
+    "ecr:BatchGetImage"
+)
+
+# タスクロールに付与するECS Exec・ログ用のアクション
+_EXEC_ACTIONS = (
+    "ssmmessages:CreateControlChannel",
+    "ssmmessages:CreateDataChannel",
+    "ssmmessages:OpenControlChannel",
+    "ssmmessages:OpenDataChannel",
+    "logs:DescribeLogGroups",
+    "logs:DescribeLogStreams",
+    "logs:CreateLogStream",
+    "logs:PutLogEvents"
+)
+
+# Minecraftコンテナの固定環境変数（バージョン・パスワード・JVM設定は別途指定）
+_BASE_MC_ENV = {
+    "EULA": "TRUE",
+    "TYPE": "PAPER",
+    "MOTD": "Minecraft on AWS ECS",
+    "DIFFICULTY": "normal",
+    "GAMEMODE": "survival",
+    "MAX_PLAYERS": "20",
+    "ENABLE_RCON": "true",
+    "RCON_PORT": "25575"
+}
+
 
 class ECSStack(Construct):
     """ECSリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("ECSClusterName", lambda s: s.cluster.cluster_name),
+        ("ECSServiceName", lambda s: s.service.service_name),
+        ("TaskDefinitionArn", lambda s: s.task_definition.task_definition_arn),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
                  project_name: str, environment: str, aws_region: str,
-                 task_name: str, cpu: int, memory: int,
+                 cluster_name: str, service_name: str, container_name: str,
+                 log_group_name: str, cpu: int, memory: int,
                  container_memory: int, container_memory_reservation: int,
                  java_memory_heap: str, rcon_password: str,
                  efs_file_system_id: str, minecraft_version: str,
                  vpc: ec2.Vpc, security_groups: list[ec2.SecurityGroup],
                  minecraft_target_group,
                  rcon_target_group,
-                 docker_image: str = None, log_retention_days: int = 7, common_tags: dict = None, **kwargs) -> None:
+                 docker_image: str = None, log_retention_days: int = 7, common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         self.project_name = project_name
         self.environment = environment
         self.aws_region = aws_region
-        self.task_name = task_name
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
         
         # Dockerイメージの決定
         # 環境変数で指定されていない場合は、デフォルトのDockerHubイメージを使用
@@ -44,66 +104,55 @@ class ECSStack(Construct):
         # CloudWatchロググループ
         self.log_group = logs.LogGroup(
             self, "MinecraftLogs",
-            log_group_name=f"/ecs/{project_name}-{task_name}",
-            retention=logs.RetentionDays.ONE_WEEK if log_retention_days == 7 else logs.RetentionDays.ONE_MONTH,
+            log_group_name=log_group_name,
+            retention=_RETENTION.get(log_retention_days, logs.RetentionDays.ONE_MONTH),
             removal_policy=RemovalPolicy.DESTROY
         )
         
         # ECSクラスター
         self.cluster = ecs.Cluster(
             self, "MinecraftCluster",
-            cluster_name=f"{project_name}-cluster",
+            cluster_name=cluster_name,
             vpc=vpc
         )
         
-        # クラスターにタグを追加（統一されたタグ）
-        for key, value in self.common_tags.items():
-            Tags.of(self).add(key, value)
-        Tags.of(self).add("Name", f"{project_name}-cluster")
-        Tags.of(self).add("ResourceType", "minecraft-cluster")
+        # クラスター固有のタグ（共通タグはMinecraftStackで一括適用）
+        Tags.of(self.cluster).add("Name", cluster_name)
+        Tags.of(self.cluster).add("ResourceType", "minecraft-cluster")
+        
+        # 両ロールで共有するプリンシパルとマネージドポリシー
+        ecs_tasks_principal = iam.ServicePrincipal("ecs-tasks.amazonaws.com")
+        execution_policy = iam.ManagedPolicy.from_aws_managed_policy_name(
+            "service-role/AmazonECSTaskExecutionRolePolicy"
+        )
+        efs_client_policy = iam.ManagedPolicy.from_aws_managed_policy_name(
+            "AmazonElasticFileSystemClientReadWriteAccess"
+        )
         
         # タスク実行ロール
         self.task_execution_role = iam.Role(
             self, "TaskExecutionRole",
-            assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com"),
-            managed_policies=[
-                iam.ManagedPolicy.from_aws_managed_policy_name("service-role/AmazonECSTaskExecutionRolePolicy")
-            ]
+            assumed_by=ecs_tasks_principal,
+            managed_policies=[execution_policy]
         )
         
         # ECRアクセス用の権限を追加
         self.task_execution_role.add_to_policy(iam.PolicyStatement(
             effect=iam.Effect.ALLOW,
-            actions=[
-                "ecr:GetAuthorizationToken",
-                "ecr:BatchCheckLayerAvailability",
-                "ecr:GetDownloadUrlForLayer",
-                "ecr:BatchGetImage"
-            ],
+            actions=list(_ECR_ACTIONS),
             resources=["*"]
         ))
         
         # タスクロール
         self.task_role = iam.Role(
             self, "TaskRole",
-            assumed_by=iam.ServicePrincipal("ecs-tasks.amazonaws.com")
+            assumed_by=ecs_tasks_principal
         )
         # EFSアクセス用の権限（Terraformと同じマネージドポリシーを使用）
-        self.task_role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name("AmazonElasticFileSystemClientReadWriteAccess")
-        )
+        self.task_role.add_managed_policy(efs_client_policy)
         # ECS Exec用の権限も追加
         self.task_role.add_to_policy(iam.PolicyStatement(
-            actions=[
-                "ssmmessages:CreateControlChannel",
-                "ssmmessages:CreateDataChannel",
-                "ssmmessages:OpenControlChannel",
-                "ssmmessages:OpenDataChannel",
-                "logs:DescribeLogGroups",
-                "logs:DescribeLogStreams",
-                "logs:CreateLogStream",
-                "logs:PutLogEvents"
-            ],
+            actions=list(_EXEC_ACTIONS),
             resources=["*"]
         ))
         
@@ -131,8 +180,8 @@ class ECSStack(Construct):
         
         # コンテナ定義
         container = self.task_definition.add_container(
-            f"{project_name}-container",
-            image=ecs.ContainerImage.from_registry(self.docker_image),
+            container_name,
+            image=self._container_image(),
             memory_limit_mib=container_memory,
             memory_reservation_mib=container_memory_reservation,
             logging=ecs.LogDrivers.aws_logs(
@@ -140,16 +189,9 @@ class ECSStack(Construct):
                 log_group=self.log_group
             ),
             environment={
-                "EULA": "TRUE",
+                **_BASE_MC_ENV,
                 "VERSION": minecraft_version,
-                "TYPE": "PAPER",
-                "MOTD": "Minecraft on AWS ECS",
-                "DIFFICULTY": "normal",
-                "GAMEMODE": "survival",
-                "MAX_PLAYERS": "20",
                 "RCON_PASSWORD": rcon_password,
-                "ENABLE_RCON": "true",
-                "RCON_PORT": "25575",
                 "JAVA_OPTS": f"-Xms{java_memory_heap} -Xmx{java_memory_heap}"
             },
             port_mappings=[
@@ -179,22 +221,20 @@ class ECSStack(Construct):
             vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PUBLIC)
         )
         
-        # サービスにタグを追加（統一されたタグ）
-        for key, value in self.common_tags.items():
-            Tags.of(self).add(key, value)
-        Tags.of(self).add("Name", f"{project_name}-service")
-        Tags.of(self).add("ResourceType", "minecraft-service")
+        # サービス固有のタグ（共通タグはMinecraftStackで一括適用）
+        Tags.of(self.service).add("Name", service_name)
+        Tags.of(self.service).add("ResourceType", "minecraft-service")
         
         # ロードバランサーとの統合
         minecraft_target_group.add_target(
             self.service.load_balancer_target(
-                container_name=f"{project_name}-container",
+                container_name=container_name,
                 container_port=25565
             )
         )
         rcon_target_group.add_target(
             self.service.load_balancer_target(
-                container_name=f"{project_name}-container",
+                container_name=container_name,
                 container_port=25575
             )
         )
@@ -202,22 +242,24 @@ class ECSStack(Construct):
         # 出力値の作成
         self._create_outputs()
     
-    def _create_outputs(self):
-        """出力値の作成"""
-        CfnOutput(
-            self, "ECSClusterName",
-            value=self.cluster.cluster_name,
-            description="ECS Cluster Name"
-        )
+    def _container_image(self) -> ecs.ContainerImage:
+        """コンテナイメージの決定（ECRのイメージはリポジトリ参照として扱う）"""
+        match = _ECR_IMAGE_URI.match(self.docker_image)
+        if not match:
+            return ecs.ContainerImage.from_registry(self.docker_image)
         
-        CfnOutput(
-            self, "ECSServiceName",
-            value=self.service.service_name,
-            description="ECS Service Name"
-        )
-        
-        CfnOutput(
-            self, "TaskDefinitionArn",
-            value=self.task_definition.task_definition_arn,
-            description="Task Definition ARN"
+        partition = "aws-cn" if match["cn"] else "aws"
+        repository = ecr.Repository.from_repository_attributes(
+            self, "MinecraftImageRepository",
+            repository_arn=(
+                f"arn:{partition}:ecr:{match['region']}:{match['account']}"
+                f":repository/{match['repository']}"
+            ),
+            repository_name=match["repository"]
         )
+        return ecs.ContainerImage.from_ecr_repository(repository, match["tag"] or "latest")
+    
+    def _create_outputs(self):
+        """出力値の作成"""
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
@@ -1,3 +1,5 @@
+from types import MappingProxyType
+from typing import Mapping
 from aws_cdk import (
     aws_elasticloadbalancingv2 as elbv2,
     aws_ec2 as ec2,
@@ -7,67 +9,59 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+# ターゲットグループ名とポート（Minecraft, RCONの順）
+_TARGET_PORTS = (("Minecraft", 25565), ("RCON", 25575))
+
 
 class LoadBalancerStack(Construct):
     """ロードバランサーリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("LoadBalancerDNS", lambda s: s.nlb.load_balancer_dns_name),
+        ("LoadBalancerArn", lambda s: s.nlb.load_balancer_arn),
+        ("MinecraftTargetGroupArn", lambda s: s.minecraft_tg.target_group_arn),
+        ("RCONTargetGroupArn", lambda s: s.rcon_tg.target_group_arn),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
-                 project_name: str, environment: str, vpc: ec2.Vpc,
-                 internal: bool = True, common_tags: dict = None, **kwargs) -> None:
+                 load_balancer_name: str, environment: str, vpc: ec2.Vpc,
+                 internal: bool = True, common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
-        self.project_name = project_name
         self.environment = environment
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
         
         # ネットワークロードバランサー
         self.nlb = elbv2.NetworkLoadBalancer(
             self, "MinecraftLoadBalancer",
             vpc=vpc,
             internet_facing=not internal,
-            load_balancer_name=f"{project_name}-lb"
+            load_balancer_name=load_balancer_name
         )
         
-        # ロードバランサーにタグを追加（統一されたタグ）
-        for key, value in self.common_tags.items():
-            Tags.of(self.nlb).add(key, value)
-        Tags.of(self.nlb).add("Name", f"{project_name}-lb")
+        # ロードバランサー固有のタグ（共通タグはMinecraftStackで一括適用）
+        Tags.of(self.nlb).add("Name", load_balancer_name)
         Tags.of(self.nlb).add("ResourceType", "minecraft-loadbalancer")
         
-        # Minecraft用ターゲットグループ（Terraformと同じ設定）
-        self.minecraft_tg = elbv2.NetworkTargetGroup(
-            self, "MinecraftTargetGroup",
-            vpc=vpc,
-            port=25565,
+        # ターゲットグループ共通のヘルスチェック（Terraformと同じ設定）
+        health_check = elbv2.HealthCheck(
+            enabled=True,
             protocol=elbv2.Protocol.TCP,
-            target_type=elbv2.TargetType.IP,
-            deregistration_delay=Duration.seconds(30),  # Terraformと同じ
-            health_check=elbv2.HealthCheck(
-                enabled=True,
-                protocol=elbv2.Protocol.TCP,
-                port="traffic-port",  # Terraformと同じ
-                healthy_threshold_count=2,        # Terraformと同じ
-                unhealthy_threshold_count=2,      # Terraformと同じ
-                interval=Duration.seconds(60),    # Terraformと同じ
-            )
+            port="traffic-port",  # Terraformと同じ
+            healthy_threshold_count=2,        # Terraformと同じ
+            unhealthy_threshold_count=2,      # Terraformと同じ
+            interval=Duration.seconds(60),    # Terraformと同じ
         )
+        deregistration_delay = Duration.seconds(30)  # Terraformと同じ
         
-        # RCON用ターゲットグループ（Terraformと同じ設定）
-        self.rcon_tg = elbv2.NetworkTargetGroup(
-            self, "RCONTargetGroup",
-            vpc=vpc,
-            port=25575,
-            protocol=elbv2.Protocol.TCP,
-            target_type=elbv2.TargetType.IP,
-            deregistration_delay=Duration.seconds(30),  # Terraformと同じ
-            health_check=elbv2.HealthCheck(
-                enabled=True,
-                protocol=elbv2.Protocol.TCP,
-                port="traffic-port",  # Terraformと同じ
-                healthy_threshold_count=2,        # Terraformと同じ
-                unhealthy_threshold_count=2,      # Terraformと同じ
-                interval=Duration.seconds(60),    # Terraformと同じ
-            )
+        # Minecraft用・RCON用ターゲットグループ
+        self.minecraft_tg, self.rcon_tg = (
+            self._create_target_group(vpc, name, port, health_check, deregistration_delay)
+            for name, port in _TARGET_PORTS
         )
         
         # リスナー
@@ -88,28 +82,21 @@ class LoadBalancerStack(Construct):
         # 出力値の作成
         self._create_outputs()
     
+    def _create_target_group(self, vpc: ec2.Vpc, name: str, port: int,
+                             health_check: elbv2.HealthCheck,
+                             deregistration_delay: Duration) -> elbv2.NetworkTargetGroup:
+        """ターゲットグループの作成"""
+        return elbv2.NetworkTargetGroup(
+            self, f"{name}TargetGroup",
+            vpc=vpc,
+            port=port,
+            protocol=elbv2.Protocol.TCP,
+            target_type=elbv2.TargetType.IP,
+            deregistration_delay=deregistration_delay,
+            health_check=health_check
+        )
+    
     def _create_outputs(self):
         """出力値の作成"""
-        CfnOutput(
-            self, "LoadBalancerDNS",
-            value=self.nlb.load_balancer_dns_name,
-            description="Load Balancer DNS Name"
-        )
-        
-        CfnOutput(
-            self, "LoadBalancerArn",
-            value=self.nlb.load_balancer_arn,
-            description="Load Balancer ARN"
-        )
-        
-        CfnOutput(
-            self, "MinecraftTargetGroupArn",
-            value=self.minecraft_tg.target_group_arn,
-            description="Minecraft Target Group ARN"
-        )
-        
-        CfnOutput(
-            self, "RCONTargetGroupArn",
-            value=self.rcon_tg.target_group_arn,
-            description="RCON Target Group ARN"
-        )
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
@@ -1,10 +1,15 @@
-import os
+from collections import deque
+from types import MappingProxyType, SimpleNamespace
+import jsii
 from aws_cdk import (
+    Aspects,
+    IAspect,
     Stack,
-    Tags,
+    TagManager,
     CfnOutput
 )
-from constructs import Construct
+from constructs import Construct, IConstruct
+from .config import StackConfig
 from .networking import NetworkingStack
 from .storage import StorageStack
 from .ec2_proxy import EC2ProxyStack
@@ -13,52 +18,115 @@ from .ecs import ECSStack
 from .monitoring import MonitoringStack
 
 
+# EC2プロキシ・モニタリングを作成するプロファイル
+_FULL_PROFILES = ("full", "prod")
+
+# サブスタックの依存関係（名前: (依存するサブスタック, 作成メソッド名)）
+# 作成メソッドは同名の属性（self.<名前>）にサブスタックを設定する
+_SUBSTACKS = {
+    "networking": ((), "_create_networking"),
+    "storage": (("networking",), "_create_storage"),
+    "ec2_proxy": (("networking",), "_create_ec2_proxy"),
+    "load_balancer": (("networking",), "_create_load_balancer"),
+    "ecs": (("networking", "storage", "load_balancer"), "_create_ecs"),
+    "monitoring": (("ecs",), "_create_monitoring"),
+}
+
+# devプロファイルでは作成しないサブスタック
+_OPTIONAL_SUBSTACKS = frozenset({"ec2_proxy", "monitoring"})
+
+
+def _topological_order(nodes: dict) -> tuple[str, ...]:
+    """Kahnのアルゴリズムでサブスタックを依存関係順に並べる"""
+    indegree = {name: len(deps) for name, (deps, _) in nodes.items()}
+    dependents = {name: [] for name in nodes}
+    for name, (deps, _) in nodes.items():
+        for dep in deps:
+            dependents[dep].append(name)
+    
+    queue = deque(name for name, count in indegree.items() if count == 0)
+    order = []
+    while queue:
+        name = queue.popleft()
+        order.append(name)
+        for dependent in dependents[name]:
+            indegree[dependent] -= 1
+            if indegree[dependent] == 0:
+                queue.append(dependent)
+    
+    if len(order) != len(nodes):
+        raise ValueError("Substack dependencies contain a cycle")
+    return tuple(order)
+
+
+# 依存関係を満たす作成順（依存のないサブスタック同士は互いに独立）
+_BUILD_ORDER = _topological_order(_SUBSTACKS)
+
+
+@jsii.implements(IAspect)
+class BulkTagAspect:
+    """複数のタグを1回のツリー走査でまとめて適用するAspect"""
+    
+    def __init__(self, tags: tuple[tuple[str, str], ...], priority: int = 100):
+        # priorityはTags.of(...).add()の既定値と同じ
+        self._tags = tags
+        self._priority = priority
+    
+    def visit(self, node: IConstruct) -> None:
+        tag_manager = TagManager.of(node)
+        if tag_manager is None:
+            return
+        for key, value in self._tags:
+            tag_manager.set_tag(key, value, self._priority, True)
+
+
 class MinecraftStack(Stack):
     """Minecraftサーバー用のメインスタック（モジュール化）"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("VPCId", lambda s: s.networking.vpc.vpc_id),
+        ("PublicSubnetId", lambda s: s.networking.vpc.public_subnets[0].subnet_id),
+        ("EFSFileSystemId", lambda s: s.storage.file_system.ref),
+        ("LoadBalancerDNS", lambda s: s.load_balancer.nlb.load_balancer_dns_name),
+        ("ECSClusterName", lambda s: s.ecs.cluster.cluster_name),
+        ("ECSServiceName", lambda s: s.ecs.service.service_name),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
-        # 設定値（環境変数から読み込み）
-        self.project_name = os.getenv("PROJECT_NAME", "minecraft-mcp")
-        self.project_prefix = self.project_name
-        self.env_name = os.getenv("ENVIRONMENT", "dev")
-        self.aws_region = os.getenv("AWS_REGION", "ap-northeast-1")
-        self.vpc_cidr = os.getenv("VPC_CIDR", "10.1.0.0/16")
-        self.availability_zone = os.getenv("AWS_AVAILABILITY_ZONES", "ap-northeast-1a")
-        # 注意: セキュリティグループでMy IP制限が自動適用されます
-        self.allowed_ips = os.getenv("ALLOWED_IPS", "0.0.0.0/0").split(",")
-        self.my_ip = os.getenv("MY_IP", "")
-        self.ssh_public_key_path = os.getenv("SSH_PUBLIC_KEY_PATH", "~/.ssh/minecraft-proxy-key.pub")
-        self.task_name = os.getenv("TASK_NAME", f"{self.project_prefix}-task")
-        self.cpu = int(os.getenv("ECS_CPU", "2048"))
-        self.memory = int(os.getenv("ECS_MEMORY", "8192"))
-        self.container_memory = int(os.getenv("CONTAINER_MEMORY", "8192"))
-        self.container_memory_reservation = int(os.getenv("CONTAINER_MEMORY_RESERVATION", "4096"))
-        self.java_memory_heap = os.getenv("JAVA_MEMORY_HEAP", "6G")
-        self.rcon_password = os.getenv("RCON_PASSWORD")
-        if not self.rcon_password:
-            raise ValueError("RCON_PASSWORD environment variable is required")
-        self.minecraft_version = os.getenv("MINECRAFT_VERSION", "1.21.8")
-        self.docker_image = os.getenv("DOCKER_IMAGE")  # 環境変数で指定、未指定の場合はNone
+        # 設定値（環境変数から読み込み・検証済み）
+        self.cfg = StackConfig.from_env()
+        
+        # リソース名（命名規則はここで一元管理する）
+        p = self.cfg.project_name
+        self.names = SimpleNamespace(
+            stack=f"{p}-stack",
+            cluster=f"{p}-cluster",
+            service=f"{p}-service",
+            container=f"{p}-container",
+            log_group=f"/ecs/{p}-{self.cfg.task_name}",
+            key_pair=f"{p}-proxy-key",
+            proxy=f"{p}-proxy",
+            eip=f"{p}-proxy-eip",
+            lb=f"{p}-lb",
+            dashboard=f"{p}-dashboard"
+        )
         
         # 統一された共通タグ（リソース検出用）
-        self.common_tags = {
-            "Project": self.project_name,
-            "Environment": self.env_name,
+        # 読み取り専用のまま全サブスタックで同じオブジェクトを共有する
+        self.common_tags = MappingProxyType({
+            "Project": self.cfg.project_name,
+            "Environment": self.cfg.env_name,
             "ManagedBy": "cdk",
             "ResourceType": "minecraft-infrastructure",
             "StackName": construct_id,
             "CreatedBy": "minecraft-mcp-project"
-        }
+        })
         
-        # リソースの作成
-        self._create_networking()
-        self._create_storage()
-        self._create_ec2_proxy()
-        self._create_load_balancer()
-        self._create_ecs()
-        self._create_monitoring()
+        # リソースの作成（依存関係順）
+        self._create_substacks()
         
         # スタック全体にタグを適用
         self._apply_common_tags()
@@ -66,15 +134,24 @@ class MinecraftStack(Stack):
         # 出力値の作成
         self._create_outputs()
     
+    def _create_substacks(self):
+        """サブスタックを依存関係順に作成"""
+        for name in _BUILD_ORDER:
+            # devプロファイルではEC2プロキシとモニタリングを作成しない
+            if name in _OPTIONAL_SUBSTACKS and self.cfg.profile not in _FULL_PROFILES:
+                setattr(self, name, None)
+                continue
+            getattr(self, _SUBSTACKS[name][1])()
+    
     def _create_networking(self):
         """ネットワークリソースの作成"""
         self.networking = NetworkingStack(
             self, "Networking",
-            project_name=self.project_name,
-            environment=self.env_name,
-            vpc_cidr=self.vpc_cidr,
-            allowed_ips=self.allowed_ips,
-            my_ip=self.my_ip,
+            project_name=self.cfg.project_name,
+            environment=self.cfg.env_name,
+            vpc_cidr=self.cfg.vpc_cidr,
+            allowed_ips=list(self.cfg.allowed_ips),
+            my_ip=self.cfg.my_ip,
             common_tags=self.common_tags
         )
     
@@ -82,8 +159,8 @@ class MinecraftStack(Stack):
         """ストレージリソースの作成"""
         self.storage = StorageStack(
             self, "Storage",
-            project_name=self.project_name,
-            environment=self.env_name,
+            project_name=self.cfg.project_name,
+            environment=self.cfg.env_name,
             vpc=self.networking.vpc,
             security_group=self.networking.efs_sg,
             common_tags=self.common_tags
@@ -93,10 +170,13 @@ class MinecraftStack(Stack):
         """EC2プロキシリソースの作成"""
         self.ec2_proxy = EC2ProxyStack(
             self, "EC2Proxy",
-            project_name=self.project_name,
-            environment=self.env_name,
+            project_name=self.cfg.project_name,
+            environment=self.cfg.env_name,
             vpc=self.networking.vpc,
             security_group=self.networking.ec2_proxy_sg,
+            key_pair_name=self.names.key_pair,
+            instance_name=self.names.proxy,
+            eip_name=self.names.eip,
             common_tags=self.common_tags
         )
     
@@ -104,8 +184,8 @@ class MinecraftStack(Stack):
         """ロードバランサーリソースの作成"""
         self.load_balancer = LoadBalancerStack(
             self, "LoadBalancer",
-            project_name=self.project_name,
-            environment=self.env_name,
+            load_balancer_name=self.names.lb,
+            environment=self.cfg.env_name,
             vpc=self.networking.vpc,
             internal=True,
             common_tags=self.common_tags
@@ -115,24 +195,27 @@ class MinecraftStack(Stack):
         """ECSリソースの作成"""
         self.ecs = ECSStack(
             self, "ECS",
-            project_name=self.project_name,
-            environment=self.env_name,
-            aws_region=self.aws_region,
-            task_name=self.task_name,
-            cpu=self.cpu,
-            memory=self.memory,
-            container_memory=self.container_memory,
-            container_memory_reservation=self.container_memory_reservation,
-            java_memory_heap=self.java_memory_heap,
-            rcon_password=self.rcon_password,
+            project_name=self.cfg.project_name,
+            environment=self.cfg.env_name,
+            aws_region=self.cfg.aws_region,
+            cluster_name=self.names.cluster,
+            service_name=self.names.service,
+            container_name=self.names.container,
+            log_group_name=self.names.log_group,
+            cpu=self.cfg.cpu,
+            memory=self.cfg.memory,
+            container_memory=self.cfg.container_memory,
+            container_memory_reservation=self.cfg.container_memory_reservation,
+            java_memory_heap=self.cfg.java_memory_heap,
+            rcon_password=self.cfg.rcon_password,
             efs_file_system_id=self.storage.file_system.ref,
-            minecraft_version=self.minecraft_version,
+            minecraft_version=self.cfg.minecraft_version,
             vpc=self.networking.vpc,
             security_groups=[self.networking.minecraft_sg, self.networking.efs_sg],
-            docker_image=self.docker_image,
+            docker_image=self.cfg.docker_image,
             minecraft_target_group=self.load_balancer.minecraft_tg,
             rcon_target_group=self.load_balancer.rcon_tg,
-            log_retention_days=7 if self.env_name != "prod" else 30,
+            log_retention_days=7 if self.cfg.env_name != "prod" else 30,
             common_tags=self.common_tags
         )
     
@@ -140,69 +223,22 @@ class MinecraftStack(Stack):
         """モニタリングリソースの作成"""
         self.monitoring = MonitoringStack(
             self, "Monitoring",
-            project_name=self.project_name,
-            environment=self.env_name,
-            aws_region=self.aws_region,
+            dashboard_name=self.names.dashboard,
+            environment=self.cfg.env_name,
+            aws_region=self.cfg.aws_region,
             cluster_name=self.ecs.cluster.cluster_name,
             service_name=self.ecs.service.service_name,
-            enable_dashboard=self.env_name == "prod",
+            enable_dashboard=self.cfg.env_name == "prod",
             common_tags=self.common_tags
         )
     
     def _apply_common_tags(self):
-        """共通タグの適用"""
-        for key, value in self.common_tags.items():
-            Tags.of(self).add(key, value)
-        
-        # 追加のタグを適用
-        Tags.of(self).add("Name", f"{self.project_name}-stack")
+        """共通タグの適用（スタック名のNameタグを含めて1つのAspectで適用）"""
+        tags = tuple(self.common_tags.items()) + (("Name", self.names.stack),)
+        Aspects.of(self).add(BulkTagAspect(tags))
     
     def _create_outputs(self):
         """出力値の作成"""
-        CfnOutput(
-            self, "VPCId",
-            value=self.networking.vpc.vpc_id,
-            description="VPC ID"
-        )
-        
-        CfnOutput(
-            self, "PublicSubnetId",
-            value=self.networking.vpc.public_subnets[0].subnet_id,
-            description="Public Subnet ID"
-        )
-        
-        CfnOutput(
-            self, "EFSFileSystemId",
-            value=self.storage.file_system.ref,
-            description="EFS File System ID"
-        )
-        
-        CfnOutput(
-            self, "EC2InstanceId",
-            value=self.ec2_proxy.instance.instance_id,
-            description="EC2 Instance ID"
-        )
-        
-        CfnOutput(
-            self, "ElasticIP",
-            value=self.ec2_proxy.eip.ref,
-            description="Elastic IP"
-        )
-        
-        CfnOutput(
-            self, "LoadBalancerDNS",
-            value=self.load_balancer.nlb.load_balancer_dns_name,
-            description="Load Balancer DNS Name"
-        )
-        
-        CfnOutput(
-            self, "ECSClusterName",
-            value=self.ecs.cluster.cluster_name,
-            description="ECS Cluster Name"
-        )
-        
-        CfnOutput(
-            self, "ECSServiceName",
-            value=self.ecs.service.service_name,
-            description="ECS Service Name"
-        )
\ No newline at end of file
+        # EC2プロキシの出力値はEC2ProxyStack側でのみ作成する
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
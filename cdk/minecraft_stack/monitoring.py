@@ -1,31 +1,42 @@
+from types import MappingProxyType
+from typing import Mapping
 from aws_cdk import (
     aws_cloudwatch as cloudwatch,
     CfnOutput
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
 
 class MonitoringStack(Construct):
     """モニタリングリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("DashboardURL", lambda s: f"https://{s.aws_region}.console.aws.amazon.com/cloudwatch/home?region={s.aws_region}#dashboards:name={s.dashboard_name}"),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
-                 project_name: str, environment: str, aws_region: str,
+                 dashboard_name: str, environment: str, aws_region: str,
                  cluster_name: str, service_name: str,
-                 enable_dashboard: bool = False, common_tags: dict = None, **kwargs) -> None:
+                 enable_dashboard: bool = False, common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
-        self.project_name = project_name
+        self.dashboard_name = dashboard_name
         self.environment = environment
         self.aws_region = aws_region
         self.cluster_name = cluster_name
         self.service_name = service_name
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
+        self._has_dashboard = bool(enable_dashboard)
         
         # CloudWatchダッシュボード（本番環境のみ）
-        if enable_dashboard:
+        if self._has_dashboard:
             self.dashboard = cloudwatch.Dashboard(
                 self, "MinecraftDashboard",
-                dashboard_name=f"{project_name}-dashboard"
+                dashboard_name=dashboard_name
             )
             
             # ダッシュボードウィジェットの作成
@@ -74,9 +85,8 @@ class MonitoringStack(Construct):
     
     def _create_outputs(self):
         """出力値の作成"""
-        if hasattr(self, 'dashboard'):
-            CfnOutput(
-                self, "DashboardURL",
-                value=f"https://{self.aws_region}.console.aws.amazon.com/cloudwatch/home?region={self.aws_region}#dashboards:name={self.project_name}-dashboard",
-                description="CloudWatch Dashboard URL"
-            )
+        if not self._has_dashboard:
+            return
+        
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
@@ -1,4 +1,10 @@
-import requests
+import json
+import os
+import time
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping
+from urllib.request import urlopen
 from aws_cdk import (
     aws_ec2 as ec2,
     CfnOutput,
@@ -6,13 +12,51 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
+# 現在のIPアドレスのキャッシュファイル（{"ip": ..., "ts": ...}）
+_MY_IP_CACHE = Path.home() / ".cache" / "minecraft-cdk" / "my_ip"
+
+
+def _cached_ip(ttl: int = 300) -> str:
+    """現在のIPアドレスを取得（TTL秒以内はキャッシュを使用）"""
+    try:
+        cached = json.loads(_MY_IP_CACHE.read_text(encoding="utf-8"))
+        if time.time() - cached["ts"] < ttl:
+            return cached["ip"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    
+    with urlopen("https://ipv4.icanhazip.com", timeout=3) as response:
+        ip = response.read().decode().strip()
+    
+    # 一時ファイルに書いてから置き換え（並行実行時も壊れたキャッシュを読まない）
+    try:
+        _MY_IP_CACHE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = _MY_IP_CACHE.with_name(f"{_MY_IP_CACHE.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps({"ip": ip, "ts": time.time()}), encoding="utf-8")
+        os.replace(tmp_path, _MY_IP_CACHE)
+    except OSError:
+        pass
+    return ip
+
 
 class NetworkingStack(Construct):
     """ネットワークリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("VPCId", lambda s: s.vpc.vpc_id),
+        ("PublicSubnetId", lambda s: s.vpc.public_subnets[0].subnet_id),
+        ("MinecraftSecurityGroupId", lambda s: s.minecraft_sg.security_group_id),
+        ("EC2ProxySecurityGroupId", lambda s: s.ec2_proxy_sg.security_group_id),
+        ("EFSSecurityGroupId", lambda s: s.efs_sg.security_group_id),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
                  project_name: str, environment: str, vpc_cidr: str,
-                 allowed_ips: list[str], my_ip: str = "", common_tags: dict = None, **kwargs) -> None:
+                 allowed_ips: list[str], my_ip: str = "", common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         self.project_name = project_name
@@ -20,7 +64,7 @@ class NetworkingStack(Construct):
         self.allowed_ips = allowed_ips
         self.vpc_cidr = vpc_cidr
         self.manual_my_ip = my_ip
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
         
         # 現在のIPアドレスを取得（手動設定されていない場合のみ）
         self.my_ip = self._get_my_ip()
@@ -75,8 +119,7 @@ class NetworkingStack(Construct):
             return self.manual_my_ip
         
         try:
-            response = requests.get("https://ipv4.icanhazip.com", timeout=10)
-            return response.text.strip() + "/32"
+            return _cached_ip() + "/32"
         except Exception as e:
             print(f"Warning: Could not fetch current IP address: {e}")
             # フォールバック: 最初のallowed_ipsを使用
@@ -115,32 +158,5 @@ class NetworkingStack(Construct):
     
     def _create_outputs(self):
         """出力値の作成"""
-        CfnOutput(
-            self, "VPCId",
-            value=self.vpc.vpc_id,
-            description="VPC ID"
-        )
-        
-        CfnOutput(
-            self, "PublicSubnetId",
-            value=self.vpc.public_subnets[0].subnet_id,
-            description="Public Subnet ID"
-        )
-        
-        CfnOutput(
-            self, "MinecraftSecurityGroupId",
-            value=self.minecraft_sg.security_group_id,
-            description="Minecraft Security Group ID"
-        )
-        
-        CfnOutput(
-            self, "EC2ProxySecurityGroupId",
-            value=self.ec2_proxy_sg.security_group_id,
-            description="EC2 Proxy Security Group ID"
-        )
-        
-        CfnOutput(
-            self, "EFSSecurityGroupId",
-            value=self.efs_sg.security_group_id,
-            description="EFS Security Group ID"
-        )
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
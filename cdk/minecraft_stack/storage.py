@@ -1,3 +1,5 @@
+from types import MappingProxyType
+from typing import Mapping
 from aws_cdk import (
     aws_efs as efs,
     aws_ec2 as ec2,
@@ -6,18 +8,27 @@ from aws_cdk import (
 )
 from constructs import Construct
 
+# common_tags未指定時の既定値（読み取り専用で共有）
+_EMPTY: Mapping[str, str] = MappingProxyType({})
+
 
 class StorageStack(Construct):
     """ストレージリソースを管理するスタック"""
     
+    # 出力値の定義（論理ID, 値を取り出す関数）
+    _OUTPUTS = (
+        ("EFSFileSystemId", lambda s: s.file_system.ref),
+        ("EFSFileSystemArn", lambda s: s.file_system.attr_arn),
+    )
+    
     def __init__(self, scope: Construct, construct_id: str,
                  project_name: str, environment: str, vpc: ec2.Vpc,
-                 security_group: ec2.SecurityGroup, common_tags: dict = None, **kwargs) -> None:
+                 security_group: ec2.SecurityGroup, common_tags: Mapping[str, str] = _EMPTY, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
         
         self.project_name = project_name
         self.environment = environment
-        self.common_tags = common_tags or {}
+        self.common_tags = common_tags
         
         # EFSファイルシステム（低レベルコンストラクトでポリシーなし）
         self.file_system = efs.CfnFileSystem(
@@ -35,27 +46,23 @@ class StorageStack(Construct):
         )
 
         # マウントターゲットを手動で作成（手動SGを使用）
-        for i, subnet in enumerate(vpc.public_subnets):
+        # 相互の依存関係を持たせないため、CloudFormationが並列に作成できる
+        sg_id = security_group.security_group_id
+        fs_id = self.file_system.ref
+        self.mount_targets = [
             efs.CfnMountTarget(
                 self, f"MinecraftDataMountTarget{i}",
-                file_system_id=self.file_system.ref,
+                file_system_id=fs_id,
                 subnet_id=subnet.subnet_id,
-                security_groups=[security_group.security_group_id]  # 手動SGを使用
+                security_groups=[sg_id]  # 手動SGを使用
             )
+            for i, subnet in enumerate(vpc.public_subnets)
+        ]
         
         # 出力値の作成
         self._create_outputs()
     
     def _create_outputs(self):
         """出力値の作成"""
-        CfnOutput(
-            self, "EFSFileSystemId",
-            value=self.file_system.ref,
-            description="EFS File System ID"
-        )
-        
-        CfnOutput(
-            self, "EFSFileSystemArn",
-            value=self.file_system.attr_arn,
-            description="EFS File System ARN"
-        )
+        for output_id, value_fn in self._OUTPUTS:
+            CfnOutput(self, output_id, value=value_fn(self))
@@ -5,132 +5,22 @@ Minecraft RCON MCP Server
 """
 import asyncio
 import concurrent.futures
+import functools
+import logging
+import logging.handlers
 import os
+import re
 import subprocess
 import sys
-from typing import Any, Dict, List, Optional
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Pattern
 
+from dotenv import dotenv_values
 from fastmcp import FastMCP
 from resource_detector import ResourceConfig, create_resource_detector
 
-
-class MinecraftRCONServer:
-    """Minecraft RCON MCP Server"""
-    
-    def __init__(self):
-        self.mcp = FastMCP("minecraft-rcon-ecs")
-        self.resources = None
-        self.project_root = None
-        self._setup()
-        self._register_tools()
-    
-    def _setup(self):
-        """サーバーの初期設定"""
-        self.log("Minecraft RCON MCP Server starting...")
-        
-        # プロジェクトルートを取得
-        self.project_root = self._get_project_root()
-        self.log(f"Detected PROJECT_ROOT: {self.project_root}")
-        
-        # .envファイルを読み込み
-        self._load_env_file()
-        
-        # 環境変数のログ出力
-        self.log(f"Environment variables:")
-        self.log(f"  PROJECT_ROOT: {self.project_root}")
-        self.log(f"  AWS_REGION: {os.getenv('AWS_REGION', 'not set')}")
-        self.log(f"  ENVIRONMENT: {os.getenv('ENVIRONMENT', 'not set')}")
-        self.log(f"  PROJECT_NAME: {os.getenv('PROJECT_NAME', 'not set')}")
-        
-        # リソース検出の初期化
-        self._initialize_resources()
-        
-        self.log("MCP Server initialized")
-    
-    def _get_project_root(self):
-        """プロジェクトルートを動的に取得する"""
-        current_dir = os.path.dirname(os.path.abspath(__file__))
-        
-        # プロジェクトルート（.envファイルがあるディレクトリ）を探す
-        search_dir = current_dir
-        while search_dir != os.path.dirname(search_dir):
-            env_file = os.path.join(search_dir, ".env")
-            if os.path.exists(env_file):
-                return search_dir
-            search_dir = os.path.dirname(search_dir)
-        
-        # .envファイルが見つからない場合は、現在のディレクトリの親を使用
-        return os.path.dirname(current_dir)
-    
-    def _load_env_file(self, env_file_path: str = None):
-        """プロジェクトの.envファイルを読み込む"""
-        if env_file_path is None:
-            env_file_path = os.path.join(self.project_root, ".env")
-        
-        self.log(f"Loading .env file from: {env_file_path}")
-        
-        if not os.path.exists(env_file_path):
-            self.log(f"Warning: .env file not found at {env_file_path}")
-            return
-        
-        try:
-            with open(env_file_path, 'r', encoding='utf-8') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-                    
-                    if '=' in line:
-                        key, value = line.split('=', 1)
-                        key = key.strip()
-                        value = value.strip()
-                        
-                        old_value = os.environ.get(key, "not set")
-                        os.environ[key] = value
-                        self.log(f"Set {key}={value} (was: {old_value})")
-                        
-        except Exception as e:
-            self.log(f"Warning: Failed to load .env file: {e}")
-    
-    def _initialize_resources(self):
-        """リソース検出の初期化"""
-        try:
-            detector = create_resource_detector()
-            self.resources = detector.detect_all_resources()
-            self.log(f"Resource detection successful:")
-            self.log(f"  Cluster: {self.resources.cluster_name}")
-            self.log(f"  Service: {self.resources.service_name}")
-            self.log(f"  Container: {self.resources.container_name}")
-            self.log(f"  Detection mode: {self.resources.detection_mode}")
-        except Exception as e:
-            self.log(f"WARNING: Failed to detect resources: {e}")
-            self.log("Creating fallback resource configuration...")
-            
-            # フォールバック設定を作成
-            from resource_detector import ResourceConfig
-            
-            self.resources = ResourceConfig(
-                cluster_name=os.getenv("CLUSTER_NAME"),
-                service_name=os.getenv("SERVICE_NAME"),
-                container_name=os.getenv("CONTAINER_NAME"),
-                task_arn=os.getenv("TASK_ARN"),
-                ec2_instance_id="",
-                nlb_dns_name="",
-                detection_mode="",
-                project_name="",
-                environment=""
-            )
-            
-            self.log(f"Using fallback configuration:")
-            self.log(f"  Cluster: {self.resources.cluster_name}")
-            self.log(f"  Service: {self.resources.service_name}")
-            self.log(f"  Container: {self.resources.container_name}")
-    
-    def _register_tools(self):
-        """MCPツールを登録"""
-        @self.mcp.tool()
-        def rcon(command: str) -> str:
-            """Perform RCON operations on the Minecraft server. Core principles and command reference:
+# rconツールの説明（MCPクライアントに提示される）
+_RCON_TOOL_DOC = """Perform RCON operations on the Minecraft server. Core principles and command reference:
 
 CORE SAFETY PRINCIPLES:
 1. Always get player coordinates before building operations
@@ -267,94 +157,367 @@ VERSION COMPATIBILITY NOTES:
 
 Always prioritize safety over convenience. When in doubt, use smaller operations and absolute coordinates.
 Always explain what each command does and potential risks to the user.
-            """
+"""
+
+# LOG_LEVEL（ecs-exec.shと共通: 0=ERROR 1=WARNING 2=INFO 3=DEBUG）でDEBUGとみなす値
+_DEBUG_LOG_LEVEL = 3
+
+# ログのバッファ件数（この件数に達するかERROR以上で標準エラー出力に書き出す）
+_LOG_BUFFER_CAPACITY = 128
+
+# ecs-exec.shのログ行（色付きのため行頭ではなく行内を検索する）
+_OUTPUT_SKIP_RE = re.compile(
+    r"\[INFO\]|\[SUCCESS\]|\[WARNING\]|\[ERROR\]|DEBUG:|Executing RCON command:"
+)
+# エラー出力では[ERROR]行を残す
+_ERROR_SKIP_RE = re.compile(r"\[INFO\]|\[SUCCESS\]|\[WARNING\]|DEBUG:")
+
+# サブプロセスの出力を読むチャンクサイズ（行の長さはこれを超えてもよい）
+_READ_CHUNK_SIZE = 64 * 1024
+
+
+def _filter_lines(lines: Iterable[str], skip_re: Pattern[str]) -> List[str]:
+    """空行とログ行を取り除く"""
+    return [line for line in lines if line.strip() and not skip_re.search(line)]
+
+
+async def _read_filtered(stream: asyncio.StreamReader, skip_re: Pattern[str]) -> List[str]:
+    """サブプロセスの出力をチャンク単位で読み、行に分割しながらフィルタする
+    
+    StreamReaderの行単位の読み込みは64KiBを超える行で失敗するため、
+    改行での分割は自前で行う（NBTのダンプなど長い1行の出力もそのまま返す）。
+    """
+    lines = []
+    buffer = bytearray()
+    while chunk := await stream.read(_READ_CHUNK_SIZE):
+        buffer += chunk
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            continue
+        complete = buffer[:end].decode(errors="replace").splitlines()
+        del buffer[:end + 1]
+        lines.extend(_filter_lines(complete, skip_re))
+    if buffer:
+        lines.extend(_filter_lines(buffer.decode(errors="replace").splitlines(), skip_re))
+    return lines
+
+
+def _env_int(name: str, default: int) -> int:
+    """環境変数を整数として読む（未設定・数値でない場合はdefault）"""
+    try:
+        return int(os.getenv(name, "") or default)
+    except ValueError:
+        return default
+
+
+class _StderrHandler(logging.StreamHandler):
+    """標準エラー出力へのハンドラ（クライアント切断時のBrokenPipeErrorは無視）"""
+    
+    def __init__(self):
+        super().__init__(sys.stderr)
+    
+    def handleError(self, record: logging.LogRecord):
+        if isinstance(sys.exc_info()[1], BrokenPipeError):
+            # クライアントが切断した場合はログ出力をスキップ
+            return
+        super().handleError(record)
+
+
+def _create_logger() -> logging.Logger:
+    """バッファ付きのサーバー用ロガーを作成"""
+    # "mcp"はfastmcp/MCP SDKが使うロガー名のため、専用の名前を使う
+    logger = logging.getLogger("minecraft_rcon")
+    if not logger.handlers:
+        stream_handler = _StderrHandler()
+        stream_handler.setFormatter(logging.Formatter("[MCP] %(message)s"))
+        # WARNING以上のログは溜めずにすぐ書き出す
+        logger.addHandler(logging.handlers.MemoryHandler(
+            _LOG_BUFFER_CAPACITY, flushLevel=logging.WARNING, target=stream_handler
+        ))
+        logger.setLevel(logging.INFO)
+        # resource_detectorのbasicConfig（rootロガー）に二重出力しない
+        logger.propagate = False
+    return logger
+
+
+@functools.lru_cache(maxsize=1)
+def _project_root() -> str:
+    """プロジェクトルート（.envファイルがあるディレクトリ）を探す（結果はプロセス内でキャッシュ）"""
+    script_dir = Path(__file__).resolve().parent
+    for search_dir in (script_dir, *script_dir.parents):
+        # 1階層につきstat()1回で.envの有無を確認する
+        try:
+            (search_dir / ".env").stat()
+        except OSError:
+            continue
+        return str(search_dir)
+    
+    # .envファイルが見つからない場合は、スクリプトのディレクトリの親を使用
+    return str(script_dir.parent)
+
+
+class MinecraftRCONServer:
+    """Minecraft RCON MCP Server"""
+    
+    def __init__(self):
+        self._logger = _create_logger()
+        self.mcp = FastMCP("minecraft-rcon-ecs")
+        self.resources = None
+        self.project_root = None
+        self._exec_env: Dict[str, str] = {}
+        self.rcon_workers = 1
+        self._setup()
+        # 同時に実行するRCONコマンドの上限（超過分は空きが出るまで待機）
+        self._rcon_slots = asyncio.Semaphore(self.rcon_workers)
+        self._register_tools()
+    
+    def _setup(self):
+        """サーバーの初期設定"""
+        self.log("Minecraft RCON MCP Server starting...")
+        
+        # プロジェクトルートを取得
+        self.project_root = _project_root()
+        self.log(f"Detected PROJECT_ROOT: {self.project_root}")
+        
+        # .envファイルを読み込み
+        self._load_env_file()
+        
+        # LOG_LEVEL=3（またはDEBUG）のときはDEBUGログも出力する
+        if (os.getenv("LOG_LEVEL", "").upper() == "DEBUG"
+                or _env_int("LOG_LEVEL", 0) >= _DEBUG_LOG_LEVEL):
+            self._logger.setLevel(logging.DEBUG)
+        
+        # 同時に実行するRCONコマンド（ECS Execセッション）の上限
+        self.rcon_workers = max(1, _env_int("RCON_WORKERS", 2))
+        
+        # 環境変数のログ出力（関連する項目は1件のログにまとめる）
+        self.log(
+            f"Environment variables:\n"
+            f"  PROJECT_ROOT: {self.project_root}\n"
+            f"  AWS_REGION: {os.getenv('AWS_REGION', 'not set')}\n"
+            f"  ENVIRONMENT: {os.getenv('ENVIRONMENT', 'not set')}\n"
+            f"  PROJECT_NAME: {os.getenv('PROJECT_NAME', 'not set')}\n"
+            f"  RCON_WORKERS: {self.rcon_workers}"
+        )
+        
+        # リソース検出の初期化
+        self._initialize_resources()
+        
+        self.log("MCP Server initialized")
+        self.flush_logs()
+    
+    def _load_env_file(self, env_file_path: str = None):
+        """プロジェクトの.envファイルを読み込む"""
+        if env_file_path is None:
+            env_file_path = os.path.join(self.project_root, ".env")
+        
+        self.log(f"Loading .env file from: {env_file_path}")
+        
+        if not os.path.exists(env_file_path):
+            self.log(f"Warning: .env file not found at {env_file_path}", logging.WARNING)
+            return
+        
+        try:
+            # 値のないキー（None）は除外し、既存の環境変数は.envの値で上書きする
+            values = {
+                key: value for key, value in dotenv_values(env_file_path).items()
+                if value is not None
+            }
+            os.environ.update(values)
+            self.log(f"Loaded {len(values)} env vars from {env_file_path}")
+            
+        except Exception as e:
+            self.log(f"Warning: Failed to load .env file: {e}", logging.WARNING)
+    
+    def _initialize_resources(self):
+        """リソース検出の初期化"""
+        try:
+            detector = create_resource_detector()
+            self.resources = detector.detect_all_resources()
+            self.log(
+                f"Resource detection successful:\n"
+                f"  Cluster: {self.resources.cluster_name}\n"
+                f"  Service: {self.resources.service_name}\n"
+                f"  Container: {self.resources.container_name}\n"
+                f"  Detection mode: {self.resources.detection_mode}"
+            )
+        except Exception as e:
+            self.log(
+                f"WARNING: Failed to detect resources: {e}\n"
+                f"Creating fallback resource configuration...",
+                logging.WARNING
+            )
+            
+            # フォールバック設定を作成
+            from resource_detector import ResourceConfig
+            
+            self.resources = ResourceConfig(
+                cluster_name=os.getenv("CLUSTER_NAME"),
+                service_name=os.getenv("SERVICE_NAME"),
+                container_name=os.getenv("CONTAINER_NAME"),
+                task_arn=os.getenv("TASK_ARN"),
+                ec2_instance_id="",
+                nlb_dns_name="",
+                detection_mode="",
+                project_name="",
+                environment=""
+            )
+            
+            self.log(
+                f"Using fallback configuration:\n"
+                f"  Cluster: {self.resources.cluster_name}\n"
+                f"  Service: {self.resources.service_name}\n"
+                f"  Container: {self.resources.container_name}"
+            )
+        
+        # ecs-exec.shに渡す環境変数を一度だけ作成
+        self._refresh_exec_env()
+    
+    def _register_tools(self):
+        """MCPツールを登録"""
+        async def rcon(command: str) -> str:
             try:
-                return self._execute_rcon_command(command)
+                return await self._submit_rcon_command(command)
             except Exception as e:
+                self.log(f"RCON tool error: {e}", logging.ERROR)
                 return f"Error: {str(e)}"
+            finally:
+                # ツール呼び出しごとにバッファ中のログを書き出す
+                self.flush_logs()
+        
+        rcon.__doc__ = _RCON_TOOL_DOC
+        self.mcp.tool()(rcon)
     
-    def _execute_rcon_command(self, command: str) -> str:
-        """Execute RCON command on Minecraft server via ECS EXEC."""
-        self.log(f"execute_rcon_command() called with command: {command}")
+    async def _submit_rcon_command(self, command: str) -> str:
+        """同時実行数の上限内でRCONコマンドを実行"""
+        async with self._rcon_slots:
+            return await self._execute_rcon_command_async(command)
+    
+    def _refresh_exec_env(self):
+        """ecs-exec.shに渡す環境変数を作成（リソースが変わった場合のみ再作成する）"""
+        overrides = {
+            "CLUSTER_NAME": self.resources.cluster_name,
+            "SERVICE_NAME": self.resources.service_name,
+            "CONTAINER_NAME": self.resources.container_name,
+            "TASK_ARN": self.resources.task_arn,
+            "AWS_REGION": os.getenv("AWS_REGION"),
+            "AWS_PROFILE": os.getenv("AWS_PROFILE"),
+            "ENVIRONMENT": os.getenv("ENVIRONMENT"),
+            "PROJECT_NAME": os.getenv("PROJECT_NAME")
+        }
+        # 未設定の値（None）は子プロセスに渡せないため除外する
+        self._exec_env = {
+            **os.environ,
+            **{key: value for key, value in overrides.items() if value is not None}
+        }
+        
+        # デバッグ用：環境変数をログ出力（DEBUG無効時は文字列の組み立て自体を省略）
+        if self._logger.isEnabledFor(logging.DEBUG):
+            self._logger.debug(
+                f"DEBUG: Passing environment variables to ecs-exec.sh:\n"
+                f"  CLUSTER_NAME: {self._exec_env.get('CLUSTER_NAME')}\n"
+                f"  SERVICE_NAME: {self._exec_env.get('SERVICE_NAME')}\n"
+                f"  CONTAINER_NAME: {self._exec_env.get('CONTAINER_NAME')}\n"
+                f"  TASK_ARN: {self._exec_env.get('TASK_ARN')}\n"
+                f"  AWS_PROFILE: {self._exec_env.get('AWS_PROFILE')}"
+            )
+    
+    def _format_rcon_output(self, lines: List[str]) -> str:
+        """フィルタ済みのコマンド出力を整形"""
+        final_output = '\n'.join(lines).strip()
+        self.log(f"RCON command result: {final_output}")
+        return (
+            final_output if final_output
+            else "Command executed successfully (no output)"
+        )
+    
+    def _format_rcon_error(self, lines: List[str], error: str) -> str:
+        """フィルタ済みのエラー出力を整形"""
+        filtered_error = '\n'.join(lines).strip()
+        self.log(f"RCON command error: {filtered_error if filtered_error else error}", logging.ERROR)
+        return (
+            f"Error executing RCON command: "
+            f"{filtered_error if filtered_error else error}"
+        )
+    
+    async def _execute_rcon_command_async(self, command: str) -> str:
+        """Execute RCON command via ECS EXEC without blocking the event loop."""
+        proc = None
         try:
             ecs_exec_script = f"{self.project_root}/scripts/ecs-exec.sh"
-            env = os.environ.copy()
             
-            # 環境変数を明示的に設定
-            env.update({
-                "CLUSTER_NAME": self.resources.cluster_name,
-                "SERVICE_NAME": self.resources.service_name,
-                "CONTAINER_NAME": self.resources.container_name,
-                "TASK_ARN": self.resources.task_arn,
-                "AWS_REGION": os.getenv("AWS_REGION"),
-                "AWS_PROFILE": os.getenv("AWS_PROFILE"),
-                "ENVIRONMENT": os.getenv("ENVIRONMENT"),
-                "PROJECT_NAME": os.getenv("PROJECT_NAME")
-            })
+            self.log(
+                f"execute_rcon_command_async() called with command: {command}\n"
+                f"Running: {ecs_exec_script} rcon \"{command}\""
+            )
+            proc = await asyncio.create_subprocess_exec(
+                ecs_exec_script, "rcon", command,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                env=self._exec_env, cwd=self.project_root
+            )
+            # AWS SSMの往復を待つ間はイベントループを他のツール呼び出しに譲る
+            # stdout/stderrは並行して1行ずつ読み、フィルタしながら蓄積する
+            stdout_lines, stderr_lines = await asyncio.gather(
+                _read_filtered(proc.stdout, _OUTPUT_SKIP_RE),
+                _read_filtered(proc.stderr, _ERROR_SKIP_RE)
+            )
+            await proc.wait()
             
-            # デバッグ用：環境変数をログ出力
-            self.log(f"DEBUG: Passing environment variables to ecs-exec.sh:")
-            self.log(f"  CLUSTER_NAME: {env.get('CLUSTER_NAME')}")
-            self.log(f"  SERVICE_NAME: {env.get('SERVICE_NAME')}")
-            self.log(f"  CONTAINER_NAME: {env.get('CONTAINER_NAME')}")
-            self.log(f"  TASK_ARN: {env.get('TASK_ARN')}")
-            self.log(f"  AWS_PROFILE: {env.get('AWS_PROFILE')}")
+            if proc.returncode != 0:
+                return self._format_rcon_error(
+                    stderr_lines,
+                    f"Command '{ecs_exec_script} rcon {command}' "
+                    f"returned non-zero exit status {proc.returncode}."
+                )
+            return self._format_rcon_output(stdout_lines)
             
-            self.log(f"Running: {ecs_exec_script} rcon \"{command}\"")
+        except Exception as e:
+            self.log(f"RCON command unexpected error: {str(e)}", logging.ERROR)
+            return f"Unexpected error: {str(e)}"
+        finally:
+            # 読み込み途中で失敗・キャンセルされた場合も子プロセスを残さない
+            if proc is not None and proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+    
+    def _execute_rcon_command(self, command: str) -> str:
+        """Execute RCON command on Minecraft server via ECS EXEC (blocking, for testing)."""
+        try:
+            ecs_exec_script = f"{self.project_root}/scripts/ecs-exec.sh"
+            
+            self.log(
+                f"execute_rcon_command() called with command: {command}\n"
+                f"Running: {ecs_exec_script} rcon \"{command}\""
+            )
             result = subprocess.run([
                 ecs_exec_script, "rcon", command
-            ], capture_output=True, text=True, check=True, env=env, cwd=self.project_root)
-            
-            # 出力から不要なデバッグ情報をフィルタリング
-            output_lines = result.stdout.split('\n')
-            filtered_output = []
-            for line in output_lines:
-                if not any(prefix in line for prefix in [
-                    '[INFO]', '[SUCCESS]', '[WARNING]', '[ERROR]', 'DEBUG:',
-                    'Executing RCON command:'
-                ]):
-                    if line.strip():
-                        filtered_output.append(line)
-            
-            final_output = '\n'.join(filtered_output).strip()
-            self.log(f"RCON command result: {final_output}")
-            return (
-                final_output if final_output
-                else "Command executed successfully (no output)"
+            ], capture_output=True, text=True, check=True, env=self._exec_env, cwd=self.project_root)
+            return self._format_rcon_output(
+                _filter_lines(result.stdout.splitlines(), _OUTPUT_SKIP_RE)
             )
             
         except subprocess.CalledProcessError as e:
-            self.log(f"RCON command error: {e.stderr if e.stderr else str(e)}")
-            # エラー出力からも不要な情報をフィルタリング
-            error_output = e.stderr if e.stderr else str(e)
-            error_lines = error_output.split('\n')
-            filtered_errors = []
-            for line in error_lines:
-                if not any(prefix in line for prefix in [
-                    '[INFO]', '[SUCCESS]', '[WARNING]', 'DEBUG:'
-                ]):
-                    if line.strip():
-                        filtered_errors.append(line)
-            filtered_error = '\n'.join(filtered_errors).strip()
-            return (
-                f"Error executing RCON command: "
-                f"{filtered_error if filtered_error else str(e)}"
+            return self._format_rcon_error(
+                _filter_lines((e.stderr or "").splitlines(), _ERROR_SKIP_RE), str(e)
             )
         except Exception as e:
-            self.log(f"RCON command unexpected error: {str(e)}")
+            self.log(f"RCON command unexpected error: {str(e)}", logging.ERROR)
             return f"Unexpected error: {str(e)}"
     
-    def log(self, message: str):
-        """シンプルなログ出力（stderrに出力してBrokenPipeErrorを回避）"""
-        try:
-            print(f"[MCP] {message}", file=sys.stderr)
-        except BrokenPipeError:
-            # クライアントが切断した場合はログ出力をスキップ
-            pass
+    def log(self, message: str, level: int = logging.INFO):
+        """ログ出力（INFOはバッファしてまとめて、WARNING以上はすぐにstderrに書き出す）"""
+        self._logger.log(level, message)
+    
+    def flush_logs(self):
+        """バッファ中のログをstderrに書き出す"""
+        for handler in self._logger.handlers:
+            handler.flush()
     
     def run(self):
         """MCPサーバーを実行"""
         self.log("Starting Minecraft RCON MCP server...")
+        self.flush_logs()
         try:
             self.mcp.run()
             self.log("Minecraft RCON MCP server finished running")
@@ -362,7 +525,8 @@ Always explain what each command does and potential risks to the user.
             # Claude Desktopが切断した場合の正常な終了
             self.log("Client disconnected (normal shutdown)")
         except Exception as e:
-            self.log(f"Error running MCP server: {e}")
+            self.log(f"Error running MCP server: {e}", logging.ERROR)
+            self.flush_logs()
             import traceback
             traceback.print_exc(file=sys.stderr)
             sys.exit(1)
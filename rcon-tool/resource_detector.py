@@ -6,17 +6,59 @@ TerraformとCDKで構築されたリソースを環境ベースで検出する
 
 import os
 import json
-import subprocess
 import logging
-import shutil
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import Request, urlopen
 from typing import Optional, Dict, List, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
-# ログ設定
-logging.basicConfig(level=logging.INFO)
+import boto3
+from botocore.config import Config
+from botocore.exceptions import BotoCoreError, ClientError
+
+# ログ設定（並列検出のログを区別できるようスレッド名＝検出タスク名を含める）
+logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s:[%(threadName)s] %(message)s")
 logger = logging.getLogger(__name__)
 
+# 検出結果のキャッシュディレクトリ（resources-<env>-<project>-<region>-<検出設定>.json）
+_CACHE_DIR = Path.home() / ".cache" / "minecraft-mcp"
+
+# リソースを直接指定する環境変数（いずれかが設定されていればキャッシュを使わない）
+_RESOURCE_ENV_VARS = ("CLUSTER_NAME", "SERVICE_NAME", "EC2_INSTANCE_ID", "NLB_DNS_NAME")
+
+# インスタンスメタデータサービス（IMDSv2）。EC2以外では接続できないため短いタイムアウトで諦める
+_IMDS_URL = "http://169.254.169.254/latest"
+_IMDS_TIMEOUT = 0.1
+
+# ページネーター1ページあたりの取得件数（list_clusters/list_servicesの上限値）
+_PAGE_SIZE = 100
+
+# 1回のDescribeClusters/DescribeServicesで指定できるARNの上限
+_DESCRIBE_CLUSTERS_BATCH = 100
+_DESCRIBE_SERVICES_BATCH = 10
+# 1回のDescribeLoadBalancers/DescribeTags（ELBv2）で指定できるARNの上限
+_DESCRIBE_LOAD_BALANCERS_BATCH = 20
+
+# 全クライアント共通の設定（スロットリング時はクライアント側で送信レートを抑えつつ再試行）
+_BOTO_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 10})
+
+# 再試行してもスロットリングが続いた場合の追加リトライ（ジッター付き指数バックオフ）
+_THROTTLING_CODES = frozenset({
+    "Throttling", "ThrottlingException", "ThrottledException", "RequestLimitExceeded",
+    "TooManyRequestsException", "RequestThrottled", "RequestThrottledException",
+})
+_BACKOFF_ATTEMPTS = 5
+_BACKOFF_BASE = 0.5
+_BACKOFF_CAP = 20.0
+
 class DetectionMode(Enum):
     """リソース検出モード"""
     AUTO = "auto"      # 環境変数 → タグ → 命名規則の順で検出
@@ -24,6 +66,12 @@ class DetectionMode(Enum):
     TAGS = "tags"      # タグベース検索のみ
     NAMING = "naming"  # 命名規則ベース検索のみ
 
+class DeploymentType(Enum):
+    """デプロイ形態"""
+    AUTO = "auto"        # EC2インスタンスも検出
+    FARGATE = "fargate"  # Fargateのみ（EC2インスタンスは検出しない）
+    EC2 = "ec2"          # EC2プロキシあり
+
 @dataclass
 class ResourceConfig:
     """検出されたリソース設定"""
@@ -37,6 +85,9 @@ class ResourceConfig:
     project_name: str
     environment: str
 
+class AWSCredentialsError(Exception):
+    """AWS認証情報が使えない場合のエラー"""
+
 class ResourceDetector:
     """統一リソース検出クラス"""
     
@@ -45,9 +96,26 @@ class ResourceDetector:
         self.project_name = project_name
         self.aws_region = aws_region
         self.detection_mode = DetectionMode(os.getenv("RESOURCE_DETECTION_MODE", "auto"))
+        self.deployment_type = DeploymentType(os.getenv("DEPLOYMENT_TYPE", "auto"))
+        # 0の場合はNLBを検出しない（NLBを使わない構成向け）
+        self.enable_nlb_detection = os.getenv("ENABLE_NLB_DETECTION", "1") != "0"
+        # 環境変数が設定されていればAWS APIで検索せずに使う（0でタグ検索を優先する従来の順序）
+        self.env_first = os.getenv("RESOURCE_ENV_FIRST", "1") != "0"
+        # 検出結果のキャッシュ有効期間（秒、0でキャッシュしない）
+        self.cache_ttl = _env_int("RESOURCE_CACHE_TTL", 3600)
+        # 検出設定もファイル名に含め、設定を変えたら別のキャッシュを使う
+        self.cache_path = _CACHE_DIR / (
+            f"resources-{environment}-{project_name}-{aws_region}-{self.detection_mode.value}"
+            f"-{self.deployment_type.value}-nlb{int(self.enable_nlb_detection)}.json"
+        )
         
-        # AWS CLIのパスを取得
-        self.aws_cli_path = self._get_aws_cli_path()
+        # AWSセッション（AWS_PROFILEなどの認証情報は環境変数から解決される）
+        self._session = boto3.Session(region_name=aws_region)
+        # 認証情報の確認が済んでいるか（成功後は再確認しない）
+        self._credentials_checked = False
+        # 検出1回の間だけ使い回すクラスター・サービスARNの一覧
+        self._cluster_arns: Optional[Tuple[str, ...]] = None
+        self._service_arns: Dict[str, Tuple[str, ...]] = {}
         
         # 共通タグ（TerraformとCDKで統一）
         self.common_tags = {
@@ -55,45 +123,167 @@ class ResourceDetector:
             "Environment": environment
         }
         
+        # 命名規則パターン（正規表現は初回に1度だけコンパイル）
+        self._build_naming_patterns()
+        
         logger.info(f"ResourceDetector initialized: env={environment}, project={project_name}, region={aws_region}")
-        logger.info(f"AWS CLI path: {self.aws_cli_path}")
     
-    def _get_aws_cli_path(self) -> str:
-        """AWS CLIのフルパスを取得"""
-        # まずwhichコマンドでAWS CLIのパスを取得
+    # サービスごとのクライアント（初回アクセス時に作成し、検出器の生存期間中は再利用する）
+    @cached_property
+    def _ecs(self):
+        return self._session.client("ecs", config=_BOTO_CONFIG)
+    
+    @cached_property
+    def _ec2(self):
+        return self._session.client("ec2", config=_BOTO_CONFIG)
+    
+    @cached_property
+    def _elbv2(self):
+        return self._session.client("elbv2", config=_BOTO_CONFIG)
+    
+    @cached_property
+    def _rgt(self):
+        return self._session.client("resourcegroupstaggingapi", config=_BOTO_CONFIG)
+    
+    def _build_naming_patterns(self):
+        """命名規則ベース検索の正規表現をコンパイル"""
+        cluster_names = (
+            f"{self.project_name}-cluster",
+            f"minecraft-{self.environment}-cluster",
+            "minecraft-cluster",
+            f"{self.project_name}-cdk-cluster",  # CDKパターン
+            "minecraft-cdk-cluster",  # 実際のクラスター名
+        )
+        service_names = (
+            f"{self.project_name}-service",
+            f"minecraft-{self.environment}-service",
+            "minecraft-service",
+            "ECSMinecraftService",  # CDKの動的命名パターン
+            "MinecraftService",  # より汎用的なパターン
+        )
+        
+        # タグが見つからない場合のフォールバック判定用（いずれかを含めばマッチ）
+        self._cluster_name_re = re.compile("|".join(map(re.escape, cluster_names)))
+        self._service_name_re = re.compile("|".join(map(re.escape, service_names)))
+        
+        # 命名規則ベース検索用（先頭のパターンほど優先）
+        self._cluster_patterns = _compile_literals(cluster_names) + (
+            re.compile(r"-cdk-cluster$"),  # CDKクラスターの汎用パターン
+            re.compile(r"-cluster$"),  # 最後の手段としてクラスターを含むもの
+        )
+        self._service_patterns = _compile_literals(service_names) + (
+            re.compile("Service"),  # 最後の手段
+        )
+        self._ec2_patterns = _compile_literals((
+            f"{self.project_name}-proxy",
+            f"minecraft-{self.environment}-proxy",
+            "minecraft-proxy",
+        ))
+        self._nlb_patterns = _compile_literals((
+            f"{self.project_name}-nlb",
+            f"minecraft-{self.environment}-nlb",
+            "minecraft-nlb",
+        ))
+    
+    def _init_clients(self, *names: str):
+        """指定したクライアントを作成"""
+        for name in names:
+            getattr(self, name)
+    
+    def detect_all_resources(self, use_cache: bool = True) -> ResourceConfig:
+        """すべてのリソースを検出して設定を返す（有効期間内のキャッシュがあれば再利用）"""
+        # 環境変数でリソースが指定されている場合は、キャッシュより環境変数を優先する
+        overrides = [name for name in _RESOURCE_ENV_VARS if os.getenv(name)]
+        cacheable = self.cache_ttl > 0 and not overrides
+        if overrides and self.cache_ttl > 0:
+            logger.info(f"Resource cache disabled by environment variables: {', '.join(overrides)}")
+        
+        if use_cache and cacheable:
+            config = self._load_cached_config()
+            if config:
+                return config
+        
+        # キャッシュを使わず検出する場合のみ、各APIを呼ぶ前に認証情報を確認する
+        self._check_credentials()
+        config = self._detect_all_resources()
+        if cacheable:
+            self._save_cached_config(config)
+        return config
+    
+    def _check_credentials(self):
+        """AWS認証情報を確認（使えない場合は各APIを呼ぶ前に失敗させる）"""
+        if self._credentials_checked:
+            return
+        try:
+            identity = self._session.client("sts", config=_BOTO_CONFIG).get_caller_identity()
+        except (BotoCoreError, ClientError) as e:
+            raise AWSCredentialsError(f"AWS credentials are not available: {e}") from e
+        logger.info(f"AWS credentials verified: {identity['Arn']}")
+        self._credentials_checked = True
+    
+    def _load_cached_config(self) -> Optional[ResourceConfig]:
+        """キャッシュから検出結果を読み込む（期限切れ・破損・タスク再検出失敗時はNone）"""
         try:
-            result = subprocess.run(["which", "aws"], capture_output=True, text=True, check=True)
-            aws_path = result.stdout.strip()
-            if aws_path and os.path.exists(aws_path):
-                return aws_path
-        except subprocess.CalledProcessError:
-            pass
-        
-        # whichで見つからない場合は、一般的なパスを試す
-        common_paths = [
-            "/usr/local/bin/aws",
-            "/opt/homebrew/bin/aws",
-            "/usr/bin/aws",
-            shutil.which("aws")
-        ]
-        
-        for path in common_paths:
-            if path and os.path.exists(path):
-                return path
-        
-        # 最後の手段として"aws"を返す（PATHに含まれている場合）
-        return "aws"
-    
-    def detect_all_resources(self) -> ResourceConfig:
-        """すべてのリソースを検出して設定を返す"""
+            if time.time() - self.cache_path.stat().st_mtime >= self.cache_ttl:
+                return None
+            config = ResourceConfig(**json.loads(self.cache_path.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError):
+            return None
+        
+        # コンテナ名は環境変数の指定を優先（キャッシュ作成後に変更されていてもよい）
+        if container_name := os.getenv("CONTAINER_NAME"):
+            config.container_name = container_name
+        
+        # タスクARNはタスクの再起動で変わるため、キャッシュ利用時もListTasksで取り直す
+        try:
+            config.task_arn = self._detect_task_arn(config.cluster_name, config.service_name)
+        except Exception as e:
+            logger.warning(f"Cached resources are stale, re-detecting: {e}")
+            return None
+        
+        logger.info(f"Using cached resources from {self.cache_path}: {config}")
+        return config
+    
+    def _save_cached_config(self, config: ResourceConfig):
+        """検出結果をキャッシュに保存"""
+        # 一時ファイルに書いてから置き換え（並行実行時も壊れたキャッシュを読まない）
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.cache_path.with_name(f"{self.cache_path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(config.__dict__), encoding="utf-8")
+            os.replace(tmp_path, self.cache_path)
+        except OSError as e:
+            logger.warning(f"Failed to write resource cache: {e}")
+    
+    def _detect_all_resources(self) -> ResourceConfig:
+        """AWS APIですべてのリソースを検出"""
         logger.info("Starting resource detection...")
         
-        cluster_name = self._detect_ecs_cluster()
-        service_name = self._detect_ecs_service(cluster_name)
-        task_arn = self._detect_task_arn(cluster_name, service_name)
-        container_name = self._detect_container_name(cluster_name, task_arn)
-        ec2_instance_id = self._detect_ec2_instance()
-        nlb_dns_name = self._detect_nlb_dns()
+        # 前回の検出結果を使わないよう一覧のキャッシュを破棄
+        self._cluster_arns = None
+        self._service_arns = {}
+        
+        # Fargateのみの構成ではEC2を、無効化されていればNLBを検出しない（APIも呼ばない）
+        detect_ec2 = self.deployment_type is not DeploymentType.FARGATE
+        detect_nlb = self.enable_nlb_detection
+        
+        # クライアントの作成はスレッドセーフではないため、ワーカーに渡す前に必要な分だけ作成しておく
+        self._init_clients(
+            "_ecs", "_rgt",
+            *(("_ec2",) if detect_ec2 else ()),
+            *(("_elbv2",) if detect_nlb else ())
+        )
+        
+        # 互いに独立したクラスター・EC2・NLBの検出を並列に実行し、
+        # クラスターに依存するサービス・タスク・コンテナはクラスター検出後に続けて実行する
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="detect") as pool:
+            ec2_future = pool.submit(_named, "ec2", self._detect_ec2_instance) if detect_ec2 else None
+            nlb_future = pool.submit(_named, "nlb", self._detect_nlb_dns) if detect_nlb else None
+            ecs_future = pool.submit(_named, "ecs", self._detect_ecs_chain)
+            
+            cluster_name, service_name, task_arn, container_name = ecs_future.result()
+            ec2_instance_id = ec2_future.result() if ec2_future else "fargate-no-ec2"
+            nlb_dns_name = nlb_future.result() if nlb_future else "no-nlb-configured"
         
         config = ResourceConfig(
             cluster_name=cluster_name,
@@ -110,10 +300,36 @@ class ResourceDetector:
         logger.info(f"Resource detection completed: {config}")
         return config
     
+    def _list_clusters_cached(self) -> Tuple[str, ...]:
+        """クラスターARNの一覧（検出1回の間はキャッシュして使い回す）"""
+        if self._cluster_arns is None:
+            self._cluster_arns = tuple(_paginate(self._ecs, "list_clusters", "clusterArns"))
+        return self._cluster_arns
+    
+    def _list_services_cached(self, cluster_name: str) -> Tuple[str, ...]:
+        """クラスター内のサービスARNの一覧（検出1回の間はキャッシュして使い回す）"""
+        if cluster_name not in self._service_arns:
+            self._service_arns[cluster_name] = tuple(
+                _paginate(self._ecs, "list_services", "serviceArns", cluster=cluster_name)
+            )
+        return self._service_arns[cluster_name]
+    
+    def _detect_ecs_chain(self) -> Tuple[str, str, str, str]:
+        """クラスター → サービス → タスク → コンテナの順に検出"""
+        cluster_name = self._detect_ecs_cluster()
+        service_name = self._detect_ecs_service(cluster_name)
+        task_arn, container_name = self._detect_task_and_container(cluster_name, service_name)
+        return cluster_name, service_name, task_arn, container_name
+    
     def _detect_ecs_cluster(self) -> str:
         """ECSクラスターを検出"""
         logger.info("Detecting ECS cluster...")
         
+        # 0. 環境変数が設定されていれば検索しない
+        if self.env_first and (cluster_name := os.getenv("CLUSTER_NAME")):
+            logger.info(f"Found cluster from environment variable: {cluster_name}")
+            return cluster_name
+        
         # 1. タグベース検索（優先）
         if self.detection_mode in [DetectionMode.AUTO, DetectionMode.TAGS]:
             clusters = self._search_ecs_clusters_by_tags()
@@ -139,6 +355,11 @@ class ResourceDetector:
         """ECSサービスを検出"""
         logger.info(f"Detecting ECS service in cluster: {cluster_name}")
         
+        # 0. 環境変数が設定されていれば検索しない
+        if self.env_first and (service_name := os.getenv("SERVICE_NAME")):
+            logger.info(f"Found service from environment variable: {service_name}")
+            return service_name
+        
         # 1. タグベース検索（優先）
         if self.detection_mode in [DetectionMode.AUTO, DetectionMode.TAGS]:
             services = self._search_ecs_services_by_tags(cluster_name)
@@ -160,84 +381,71 @@ class ResourceDetector:
         
         # 4. 最後の手段：クラスター内の最初のサービスを取得
         try:
-            result = subprocess.run([
-                self.aws_cli_path, "ecs", "list-services",
-                "--cluster", cluster_name,
-                "--query", "serviceArns[0]",
-                "--output", "text",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
-            
-            service_arn = result.stdout.strip()
-            if service_arn and service_arn != "None":
-                service_name = service_arn.split("/")[-1]
+            service_arns = self._list_services_cached(cluster_name)
+            if service_arns:
+                service_name = service_arns[0].split("/")[-1]
                 logger.info(f"Found service as fallback: {service_name}")
                 return service_name
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to get first service as fallback: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to get first service as fallback: {e}")
         
         raise Exception(f"ECS service not found in cluster '{cluster_name}'")
     
     def _detect_task_arn(self, cluster_name: str, service_name: str) -> str:
         """実行中のタスクARNを検出"""
-        logger.info(f"Detecting running task for service: {service_name}")
-        
+        return self._detect_task_and_container(cluster_name, service_name)[0]
+    
+    def _detect_task_and_container(self, cluster_name: str, service_name: str) -> Tuple[str, str]:
+        """実行中のタスクARNとコンテナ名を検出（ListTasks・DescribeTasksを各1回だけ呼ぶ）"""
+        logger.info(f"Detecting running task and container for service: {service_name}")
         try:
-            result = subprocess.run([
-                self.aws_cli_path, "ecs", "list-tasks",
-                "--cluster", cluster_name,
-                "--service-name", service_name,
-                "--query", "taskArns[0]",
-                "--output", "text",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
-            
-            task_arn = result.stdout.strip()
-            if task_arn and task_arn != "None":
-                logger.info(f"Found running task: {task_arn}")
-                return task_arn
-            else:
+            task_arns = _with_backoff(self._ecs.list_tasks, cluster=cluster_name, serviceName=service_name)["taskArns"]
+            if not task_arns:
                 raise Exception(f"No running tasks found for service {service_name}")
-                
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"Failed to list tasks: {e.stderr}")
-    
-    def _detect_container_name(self, cluster_name: str, task_arn: str) -> str:
-        """コンテナ名を検出"""
-        logger.info(f"Detecting container name for task: {task_arn}")
+            # ListTasksの結果（最大100件）をまとめて取得し、RUNNINGのタスクを優先する
+            tasks = _with_backoff(self._ecs.describe_tasks, cluster=cluster_name, tasks=task_arns)["tasks"]
+        except (BotoCoreError, ClientError) as e:
+            raise Exception(f"Failed to detect task: {e}")
         
-        # 1. 環境変数から取得
-        if container_name := os.getenv("CONTAINER_NAME"):
-            logger.info(f"Found container from environment variable: {container_name}")
-            return container_name
+        tasks.sort(key=lambda task: task.get("lastStatus") != "RUNNING")
+        tasks = [task for task in tasks if task.get("containers")]
+        if not tasks:
+            raise Exception("No container found in task")
         
-        # 2. タスクから取得
-        try:
-            result = subprocess.run([
-                self.aws_cli_path, "ecs", "describe-tasks",
-                "--cluster", cluster_name,
-                "--tasks", task_arn,
-                "--query", "tasks[0].containers[0].name",
-                "--output", "text",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
-            
-            container_name = result.stdout.strip()
-            if container_name:
-                logger.info(f"Found container: {container_name}")
-                return container_name
-            else:
-                raise Exception("No container found in task")
-                
-        except subprocess.CalledProcessError as e:
-            raise Exception(f"Failed to describe task: {e.stderr}")
+        # コンテナ名が環境変数で指定されていれば、そのコンテナを持つタスクを選ぶ
+        if container_name := os.getenv("CONTAINER_NAME"):
+            task = next(
+                (task for task in tasks
+                 if any(container["name"] == container_name for container in task["containers"])),
+                None
+            )
+            if task is None:
+                logger.warning(f"Container '{container_name}' not found in tasks, using {tasks[0]['taskArn']}")
+                task = tasks[0]
+            logger.info(f"Found running task: {task['taskArn']}, container from environment variable: {container_name}")
+            return task["taskArn"], container_name
+        
+        task_arn = tasks[0]["taskArn"]
+        container_name = tasks[0]["containers"][0]["name"]
+        logger.info(f"Found running task: {task_arn}, container: {container_name}")
+        return task_arn, container_name
     
     def _detect_ec2_instance(self) -> str:
         """EC2インスタンスを検出（Fargateの場合はオプショナル）"""
         logger.info("Detecting EC2 instance...")
         
+        # 0. 環境変数が設定されていれば検索しない
+        if self.env_first and (instance_id := os.getenv("EC2_INSTANCE_ID")):
+            logger.info(f"Found EC2 instance from environment variable: {instance_id}")
+            return instance_id
+        
         # 1. タグベース検索（優先）
         if self.detection_mode in [DetectionMode.AUTO, DetectionMode.TAGS]:
+            # 自身がプロキシのEC2上で動いている場合はAPIを呼ばずにメタデータから取得
+            if instance_id := self._detect_own_ec2_instance():
+                logger.info(f"Found EC2 instance from instance metadata: {instance_id}")
+                return instance_id
+            
             instances = self._search_ec2_instances_by_tags()
             if instances:
                 logger.info(f"Found EC2 instance by tags: {instances[0]}")
@@ -259,10 +467,32 @@ class ResourceDetector:
         logger.warning(f"EC2 instance not found for project '{self.project_name}' - this is normal for Fargate deployments")
         return "fargate-no-ec2"
     
+    def _detect_own_ec2_instance(self) -> Optional[str]:
+        """IMDSv2で自身のインスタンスIDを取得（Project/Environmentタグが一致する場合のみ）"""
+        if os.getenv("AWS_EC2_METADATA_DISABLED", "").lower() == "true":
+            return None
+        try:
+            token = _imds_request("/api/token", method="PUT", headers={
+                "X-aws-ec2-metadata-token-ttl-seconds": "60"
+            })
+            headers = {"X-aws-ec2-metadata-token": token}
+            # インスタンスタグはメタデータでのタグ参照が有効な場合のみ取得できる
+            if (_imds_request("/meta-data/tags/instance/Project", headers=headers) != self.project_name
+                    or _imds_request("/meta-data/tags/instance/Environment", headers=headers) != self.environment):
+                return None
+            return _imds_request("/meta-data/instance-id", headers=headers)
+        except (URLError, OSError):
+            return None
+    
     def _detect_nlb_dns(self) -> str:
         """NLB DNS名を検出（オプショナル）"""
         logger.info("Detecting NLB DNS name...")
         
+        # 0. 環境変数が設定されていれば検索しない
+        if self.env_first and (dns_name := os.getenv("NLB_DNS_NAME")):
+            logger.info(f"Found NLB DNS from environment variable: {dns_name}")
+            return dns_name
+        
         # 1. タグベース検索（優先）
         if self.detection_mode in [DetectionMode.AUTO, DetectionMode.TAGS]:
             dns_names = self._search_nlb_by_tags()
@@ -286,355 +516,318 @@ class ResourceDetector:
         logger.warning(f"NLB not found for project '{self.project_name}' - this is optional")
         return "no-nlb-configured"
     
-    def _search_ecs_clusters_by_tags(self) -> List[str]:
-        """タグベースでECSクラスターを検索（CDK対応）"""
+    def _rgt_find(self, resource_type: str) -> Optional[List[str]]:
+        """Resource Groups Tagging APIでProject/Environmentタグが一致するリソースのARNを取得
+        
+        1回のAPI呼び出しで検索する。失敗した場合はNoneを返す（呼び出し側で従来の検索にフォールバック）
+        """
         try:
-            # まず、すべてのクラスターを取得
-            result = subprocess.run([
-                self.aws_cli_path, "ecs", "list-clusters",
-                "--output", "json",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
+            mappings = _paginate(
+                self._rgt, "get_resources", "ResourceTagMappingList",
+                TagFilters=[
+                    {"Key": "Project", "Values": [self.project_name]},
+                    {"Key": "Environment", "Values": [self.environment]}
+                ],
+                ResourceTypeFilters=[resource_type]
+            )
+            return [mapping["ResourceARN"] for mapping in mappings]
             
-            clusters_data = json.loads(result.stdout)
-            clusters = clusters_data.get("clusterArns", [])
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search {resource_type} via Resource Groups Tagging API: {e}")
+            return None
+    
+    def _search_ecs_clusters_by_tags(self) -> List[str]:
+        """タグベースでECSクラスターを検索"""
+        arns = self._rgt_find("ecs:cluster")
+        if arns is None:
+            return self._scan_ecs_clusters_by_tags()
+        return [arn.split("/")[-1] for arn in arns]
+    
+    def _scan_ecs_clusters_by_tags(self) -> List[str]:
+        """全クラスターのタグを確認してECSクラスターを検索（CDK対応、Tagging APIが使えない場合）"""
+        try:
             matching_clusters = []
             
-            for cluster_arn in clusters:
-                cluster_name = cluster_arn.split("/")[-1]
+            # すべてのクラスターを取得し、タグはDescribe APIの上限件数ずつまとめて取得
+            for chunk in _chunks(self._list_clusters_cached(), _DESCRIBE_CLUSTERS_BATCH):
+                described = _with_backoff(
+                    self._ecs.describe_clusters, clusters=list(chunk), include=["TAGS"]
+                )["clusters"]
+                tags_by_name = {item["clusterName"]: item.get("tags") for item in described}
                 
-                # タグベースの検索を試行
-                try:
-                    tag_result = subprocess.run([
-                        self.aws_cli_path, "ecs", "describe-clusters",
-                        "--clusters", cluster_name,
-                        "--include", "TAGS",
-                        "--query", "clusters[0].tags",
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    tags = json.loads(tag_result.stdout)
-                    # Pythonでタグをフィルタリング
-                    project_tag_found = False
-                    if tags:  # tagsがNoneでない場合のみ処理
-                        project_tag_found = any(
-                            tag.get("key") == "Project" and tag.get("value") == self.project_name
-                            for tag in tags
-                        )
+                for cluster_arn in chunk:
+                    cluster_name = cluster_arn.split("/")[-1]
+                    tags = _tag_dict(tags_by_name.get(cluster_name))
                     
-                    if project_tag_found:
+                    if tags.get("Project") == self.project_name and tags.get("Environment") == self.environment:
                         matching_clusters.append(cluster_name)
                         logger.info(f"Found cluster by tags: {cluster_name}")
                         continue
-                        
-                except subprocess.CalledProcessError:
-                    pass
-                
-                # タグが見つからない場合は命名規則でフォールバック
-                if self._matches_cluster_naming_pattern(cluster_name):
-                    matching_clusters.append(cluster_name)
-                    logger.info(f"Found cluster by naming pattern: {cluster_name}")
+                    
+                    # タグが見つからない場合は命名規則でフォールバック
+                    if self._matches_cluster_naming_pattern(cluster_name):
+                        matching_clusters.append(cluster_name)
+                        logger.info(f"Found cluster by naming pattern: {cluster_name}")
             
             return matching_clusters
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search clusters by tags: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search clusters by tags: {e}")
             return []
     
     def _matches_cluster_naming_pattern(self, cluster_name: str) -> bool:
         """クラスター名が命名パターンにマッチするかチェック"""
-        patterns = [
-            f"{self.project_name}-cluster",
-            f"minecraft-{self.environment}-cluster",
-            f"minecraft-cluster",
-            f"{self.project_name}-cdk-cluster",
-            f"minecraft-cdk-cluster"
-        ]
-        
-        for pattern in patterns:
-            if pattern in cluster_name:
-                return True
-        return False
+        return bool(self._cluster_name_re.search(cluster_name))
     
     def _search_ecs_clusters_by_naming(self) -> Optional[str]:
         """命名規則ベースでECSクラスターを検索（CDK対応）"""
         try:
-            # CDKの命名規則に対応した複数のパターンを試行
-            patterns = [
-                f"{self.project_name}-cluster",
-                f"minecraft-{self.environment}-cluster", 
-                f"minecraft-cluster",
-                f"{self.project_name}-cdk-cluster",  # CDKパターン
-                f"minecraft-cdk-cluster",  # 実際のクラスター名
-                f"*-cdk-cluster",  # CDKクラスターの汎用パターン
-                f"*-cluster"  # 最後の手段としてクラスターを含むもの
-            ]
-            
-            for pattern in patterns:
-                if "*" in pattern:
-                    # ワイルドカードパターンの場合、すべてのクラスターを取得してフィルタリング
-                    result = subprocess.run([
-                        self.aws_cli_path, "ecs", "list-clusters",
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    clusters = json.loads(result.stdout)
-                    for cluster_arn in clusters:
-                        cluster_name = cluster_arn.split("/")[-1]
-                        if self._matches_pattern(cluster_name, pattern):
-                            logger.info(f"Found cluster by wildcard pattern '{pattern}': {cluster_name}")
-                            return cluster_name
-                else:
-                    # 通常のパターンマッチング
-                    result = subprocess.run([
-                        self.aws_cli_path, "ecs", "list-clusters",
-                        "--query", f"clusterArns[?contains(@, '{pattern}')]",
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    clusters = json.loads(result.stdout)
-                    if clusters:
-                        cluster_name = clusters[0].split("/")[-1]
-                        logger.info(f"Found cluster by pattern '{pattern}': {cluster_name}")
+            # 一覧は1回だけ取得し、CDKの命名規則に対応した複数のパターンを優先順に照合する
+            names = [arn.split("/")[-1] for arn in self._list_clusters_cached()]
+            for pattern in self._cluster_patterns:
+                for cluster_name in names:
+                    if pattern.search(cluster_name):
+                        logger.info(f"Found cluster by pattern '{pattern.pattern}': {cluster_name}")
                         return cluster_name
             
             return None
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search clusters by naming: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search clusters by naming: {e}")
             return None
     
-    def _matches_pattern(self, name: str, pattern: str) -> bool:
-        """名前がパターンにマッチするかチェック"""
-        if "*" not in pattern:
-            return pattern in name
-        
-        # シンプルなワイルドカードマッチング
-        if pattern.startswith("*") and pattern.endswith("*"):
-            return pattern[1:-1] in name
-        elif pattern.startswith("*"):
-            return name.endswith(pattern[1:])
-        elif pattern.endswith("*"):
-            return name.startswith(pattern[:-1])
-        
-        return False
-    
     def _search_ecs_services_by_tags(self, cluster_name: str) -> List[str]:
-        """タグベースでECSサービスを検索（CDK対応）"""
+        """タグベースでECSサービスを検索"""
+        arns = self._rgt_find("ecs:service")
+        if arns is None:
+            return self._scan_ecs_services_by_tags(cluster_name)
+        # サービスARN: arn:aws:ecs:<region>:<account>:service/<cluster>/<service>
+        return [arn.split("/")[-1] for arn in arns if f"/{cluster_name}/" in arn]
+    
+    def _scan_ecs_services_by_tags(self, cluster_name: str) -> List[str]:
+        """全サービスのタグを確認してECSサービスを検索（CDK対応、Tagging APIが使えない場合）"""
         try:
-            # まず、すべてのサービスを取得
-            result = subprocess.run([
-                self.aws_cli_path, "ecs", "list-services",
-                "--cluster", cluster_name,
-                "--output", "json",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
-            
-            services_data = json.loads(result.stdout)
-            services = services_data.get("serviceArns", [])
             matching_services = []
             
-            for service_arn in services:
-                service_name = service_arn.split("/")[-1]
-                
-                # タグベースの検索を試行
+            # すべてのサービスを取得し、タグはDescribe APIの上限件数ずつまとめて取得
+            for chunk in _chunks(self._list_services_cached(cluster_name), _DESCRIBE_SERVICES_BATCH):
                 try:
-                    tag_result = subprocess.run([
-                        self.aws_cli_path, "ecs", "describe-services",
-                        "--cluster", cluster_name,
-                        "--services", service_name,
-                        "--query", "services[0].tags",
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    tags = json.loads(tag_result.stdout)
-                    # Pythonでタグをフィルタリング
-                    project_tag_found = False
-                    if tags:  # tagsがNoneでない場合のみ処理
-                        project_tag_found = any(
-                            tag.get("key") == "Project" and tag.get("value") == self.project_name
-                            for tag in tags
-                        )
+                    described = _with_backoff(
+                        self._ecs.describe_services, cluster=cluster_name, services=list(chunk), include=["TAGS"]
+                    )["services"]
+                    tags_by_name = {item["serviceName"]: item.get("tags") for item in described}
+                except ClientError:
+                    tags_by_name = {}
+                
+                for service_arn in chunk:
+                    service_name = service_arn.split("/")[-1]
+                    tags = _tag_dict(tags_by_name.get(service_name))
                     
-                    if project_tag_found:
+                    if tags.get("Project") == self.project_name and tags.get("Environment") == self.environment:
                         matching_services.append(service_name)
                         logger.info(f"Found service by tags: {service_name}")
                         continue
-                        
-                except subprocess.CalledProcessError:
-                    pass
-                
-                # タグが見つからない場合は命名規則でフォールバック
-                if self._matches_service_naming_pattern(service_name):
-                    matching_services.append(service_name)
-                    logger.info(f"Found service by naming pattern: {service_name}")
+                    
+                    # タグが見つからない場合は命名規則でフォールバック
+                    if self._matches_service_naming_pattern(service_name):
+                        matching_services.append(service_name)
+                        logger.info(f"Found service by naming pattern: {service_name}")
             
             return matching_services
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search services by tags: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search services by tags: {e}")
             return []
     
     def _matches_service_naming_pattern(self, service_name: str) -> bool:
         """サービス名が命名パターンにマッチするかチェック"""
-        patterns = [
-            f"{self.project_name}-service",
-            f"minecraft-{self.environment}-service",
-            f"minecraft-service",
-            "ECSMinecraftService",  # CDKの動的命名パターン
-            "MinecraftService"  # より汎用的なパターン
-        ]
-        
-        for pattern in patterns:
-            if pattern in service_name:
-                return True
-        return False
+        return bool(self._service_name_re.search(service_name))
     
     def _search_ecs_services_by_naming(self, cluster_name: str) -> Optional[str]:
         """命名規則ベースでECSサービスを検索（CDK対応）"""
         try:
-            # CDKの動的命名に対応したパターン
-            patterns = [
-                f"{self.project_name}-service",
-                f"minecraft-{self.environment}-service",
-                f"minecraft-service",
-                f"*ECSMinecraftService*",  # CDKの動的命名パターン
-                f"*MinecraftService*",  # より汎用的なパターン
-                f"*Service*"  # 最後の手段
-            ]
-            
-            for pattern in patterns:
-                if "*" in pattern:
-                    # ワイルドカードパターンの場合
-                    result = subprocess.run([
-                        self.aws_cli_path, "ecs", "list-services",
-                        "--cluster", cluster_name,
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    services = json.loads(result.stdout)
-                    for service_arn in services:
-                        service_name = service_arn.split("/")[-1]
-                        if self._matches_pattern(service_name, pattern):
-                            logger.info(f"Found service by wildcard pattern '{pattern}': {service_name}")
-                            return service_name
-                else:
-                    # 通常のパターンマッチング
-                    result = subprocess.run([
-                        self.aws_cli_path, "ecs", "list-services",
-                        "--cluster", cluster_name,
-                        "--query", f"serviceArns[?contains(@, '{pattern}')]",
-                        "--output", "json",
-                        "--region", self.aws_region
-                    ], capture_output=True, text=True, check=True)
-                    
-                    services = json.loads(result.stdout)
-                    if services:
-                        service_name = services[0].split("/")[-1]
-                        logger.info(f"Found service by pattern '{pattern}': {service_name}")
+            # 一覧は1回だけ取得し、CDKの動的命名に対応したパターンを優先順に照合する
+            names = [arn.split("/")[-1] for arn in self._list_services_cached(cluster_name)]
+            for pattern in self._service_patterns:
+                for service_name in names:
+                    if pattern.search(service_name):
+                        logger.info(f"Found service by pattern '{pattern.pattern}': {service_name}")
                         return service_name
             
             return None
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search services by naming: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search services by naming: {e}")
             return None
     
     def _search_ec2_instances_by_tags(self) -> List[str]:
         """タグベースでEC2インスタンスを検索"""
         try:
-            result = subprocess.run([
-                self.aws_cli_path, "ec2", "describe-instances",
-                "--filters", "Name=instance-state-name,Values=running",
-                "--query", f"Reservations[].Instances[?Tags[?Key=='Project' && Value=='{self.project_name}'] && Tags[?Key=='Environment' && Value=='{self.environment}']].InstanceId",
-                "--output", "json",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
+            reservations = _paginate(
+                self._ec2, "describe_instances", "Reservations",
+                # タグはサーバー側でフィルタリングし、該当するインスタンスのみ取得する
+                Filters=[
+                    {"Name": "instance-state-name", "Values": ["running"]},
+                    {"Name": "tag:Project", "Values": [self.project_name]},
+                    {"Name": "tag:Environment", "Values": [self.environment]},
+                ]
+            )
+            return [instance["InstanceId"] for reservation in reservations for instance in reservation["Instances"]]
             
-            instances = json.loads(result.stdout)
-            return [instance for sublist in instances for instance in sublist]
-            
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search EC2 instances by tags: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search EC2 instances by tags: {e}")
             return []
     
     def _search_ec2_instances_by_naming(self) -> Optional[str]:
         """命名規則ベースでEC2インスタンスを検索"""
         try:
-            patterns = [
-                f"{self.project_name}-proxy",
-                f"minecraft-{self.environment}-proxy",
-                f"minecraft-proxy"
+            # 実行中のインスタンスは1回だけ取得し、パターンの優先順にPython側で照合する
+            reservations = _paginate(
+                self._ec2, "describe_instances", "Reservations",
+                Filters=[{"Name": "instance-state-name", "Values": ["running"]}]
+            )
+            instances = [
+                (
+                    instance["InstanceId"],
+                    next((tag["Value"] for tag in instance.get("Tags", []) if tag["Key"] == "Name"), "")
+                )
+                for reservation in reservations
+                for instance in reservation["Instances"]
             ]
             
-            for pattern in patterns:
-                result = subprocess.run([
-                    self.aws_cli_path, "ec2", "describe-instances",
-                    "--filters", "Name=instance-state-name,Values=running",
-                    "--query", f"Reservations[].Instances[?Tags[?Key=='Name' && contains(Value, '{pattern}')]].InstanceId",
-                    "--output", "json",
-                    "--region", self.aws_region
-                ], capture_output=True, text=True, check=True)
-                
-                instances = json.loads(result.stdout)
-                if instances and instances[0]:
-                    return instances[0][0]
+            for pattern in self._ec2_patterns:
+                for instance_id, name in instances:
+                    if pattern.search(name):
+                        return instance_id
             
             return None
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search EC2 instances by naming: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search EC2 instances by naming: {e}")
             return None
     
     def _search_nlb_by_tags(self) -> List[str]:
         """タグベースでNLBを検索"""
+        arns = self._rgt_find("elasticloadbalancing:loadbalancer")
+        if arns is None:
+            return self._scan_nlb_by_tags()
+        
+        # ARNからNLB（loadbalancer/net/...）のみを対象にDNS名を取得
+        nlb_arns = [arn for arn in arns if ":loadbalancer/net/" in arn]
+        if not nlb_arns:
+            return []
         try:
-            result = subprocess.run([
-                self.aws_cli_path, "elbv2", "describe-load-balancers",
-                "--query", f"LoadBalancers[?Tags[?Key=='Project' && Value=='{self.project_name}'] && Tags[?Key=='Environment' && Value=='{self.environment}']].DNSName",
-                "--output", "json",
-                "--region", self.aws_region
-            ], capture_output=True, text=True, check=True)
+            dns_names = []
+            for chunk in _chunks(nlb_arns, _DESCRIBE_LOAD_BALANCERS_BATCH):
+                load_balancers = _with_backoff(
+                    self._elbv2.describe_load_balancers, LoadBalancerArns=chunk
+                )["LoadBalancers"]
+                dns_names.extend(lb["DNSName"] for lb in load_balancers)
+            return dns_names
             
-            dns_names = json.loads(result.stdout)
-            return [dns for sublist in dns_names for dns in sublist]
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to describe NLB found by tags: {e}")
+            return []
+    
+    def _scan_nlb_by_tags(self) -> List[str]:
+        """全ロードバランサーからタグベースでNLBを検索（Tagging APIが使えない場合）"""
+        try:
+            load_balancers = _paginate(self._elbv2, "describe_load_balancers", "LoadBalancers")
+            if not load_balancers:
+                return []
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search NLB by tags: {e.stderr}")
+            # DescribeLoadBalancersはタグを返さないため、DescribeTagsでまとめて取得（最大20件ずつ）
+            dns_by_arn = {lb["LoadBalancerArn"]: lb["DNSName"] for lb in load_balancers}
+            arns = list(dns_by_arn)
+            dns_names = []
+            for chunk in _chunks(arns, _DESCRIBE_LOAD_BALANCERS_BATCH):
+                for description in _with_backoff(self._elbv2.describe_tags, ResourceArns=chunk)["TagDescriptions"]:
+                    tags = {tag["Key"]: tag["Value"] for tag in description.get("Tags", [])}
+                    if tags.get("Project") == self.project_name and tags.get("Environment") == self.environment:
+                        dns_names.append(dns_by_arn[description["ResourceArn"]])
+            return dns_names
+            
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search NLB by tags: {e}")
             return []
     
     def _search_nlb_by_naming(self) -> Optional[str]:
         """命名規則ベースでNLBを検索"""
         try:
-            patterns = [
-                f"{self.project_name}-nlb",
-                f"minecraft-{self.environment}-nlb",
-                f"minecraft-nlb"
-            ]
-            
-            for pattern in patterns:
-                result = subprocess.run([
-                    self.aws_cli_path, "elbv2", "describe-load-balancers",
-                    "--query", f"LoadBalancers[?contains(LoadBalancerName, '{pattern}')].DNSName",
-                    "--output", "json",
-                    "--region", self.aws_region
-                ], capture_output=True, text=True, check=True)
-                
-                dns_names = json.loads(result.stdout)
-                if dns_names:
-                    return dns_names[0]
+            # ロードバランサーは1回だけ取得し、パターンの優先順にPython側で照合する
+            load_balancers = _paginate(self._elbv2, "describe_load_balancers", "LoadBalancers")
+            for pattern in self._nlb_patterns:
+                for lb in load_balancers:
+                    if pattern.search(lb["LoadBalancerName"]):
+                        return lb["DNSName"]
             
             return None
             
-        except subprocess.CalledProcessError as e:
-            logger.warning(f"Failed to search NLB by naming: {e.stderr}")
+        except (BotoCoreError, ClientError) as e:
+            logger.warning(f"Failed to search NLB by naming: {e}")
             return None
 
+def _paginate(client, operation: str, result_key: str, **kwargs) -> List:
+    """ページネーターで全ページを取得し、result_keyの要素を連結して返す"""
+    # スロットリング時はクライアントの設定（_BOTO_CONFIG）でページごとに再試行される
+    # （全体を_with_backoffで再試行すると取得済みのページも取り直すため使わない）
+    items = []
+    paginator = client.get_paginator(operation)
+    for page in paginator.paginate(PaginationConfig={"PageSize": _PAGE_SIZE}, **kwargs):
+        items.extend(page.get(result_key, []))
+    return items
+
+def _with_backoff(func, *args, **kwargs):
+    """スロットリングエラーの場合はジッター付き指数バックオフで再試行して関数を実行"""
+    for attempt in range(_BACKOFF_ATTEMPTS):
+        try:
+            return func(*args, **kwargs)
+        except ClientError as e:
+            code = e.response.get("Error", {}).get("Code")
+            if code not in _THROTTLING_CODES or attempt == _BACKOFF_ATTEMPTS - 1:
+                raise
+            delay = random.uniform(0, min(_BACKOFF_CAP, _BACKOFF_BASE * 2 ** attempt))
+            logger.warning(f"Throttled ({code}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+def _env_int(name: str, default: int) -> int:
+    """環境変数を整数として読む（未設定・数値でない場合はdefault）"""
+    value = os.getenv(name, "")
+    try:
+        return int(value or default)
+    except ValueError:
+        logger.warning(f"Invalid {name}={value!r}, using default: {default}")
+        return default
+
+def _tag_dict(tags: Optional[List[Dict[str, str]]]) -> Dict[str, str]:
+    """ECS APIのタグ一覧（key/value）を辞書に変換"""
+    return {tag["key"]: tag["value"] for tag in (tags or [])}
+
+def _compile_literals(names) -> Tuple[re.Pattern, ...]:
+    """名前を含むかどうかを判定する正規表現のタプルを作成"""
+    return tuple(re.compile(re.escape(name)) for name in names)
+
+def _imds_request(path: str, method: str = "GET", headers: Optional[Dict[str, str]] = None) -> str:
+    """インスタンスメタデータサービスにリクエストし、本文を返す"""
+    request = Request(f"{_IMDS_URL}{path}", method=method, headers=headers or {})
+    with urlopen(request, timeout=_IMDS_TIMEOUT) as response:
+        return response.read().decode().strip()
+
+def _chunks(items, size: int):
+    """itemsをsize件ずつに分割"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _named(name: str, func, *args):
+    """ログで区別できるよう、実行中のスレッド名を検出タスク名にして関数を実行"""
+    thread = threading.current_thread()
+    original_name = thread.name
+    thread.name = name
+    try:
+        return func(*args)
+    finally:
+        thread.name = original_name
+
 def create_resource_detector() -> ResourceDetector:
     """環境変数からResourceDetectorを作成"""
     environment = os.getenv("ENVIRONMENT", "dev")
@@ -644,7 +837,13 @@ def create_resource_detector() -> ResourceDetector:
     return ResourceDetector(environment, project_name, aws_region)
 
 if __name__ == "__main__":
-    # テスト用
+    # テスト用（--no-cacheでキャッシュを使わずに検出）
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Detect Minecraft MCP AWS resources")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the cached detection result")
+    args = parser.parse_args()
+    
     detector = create_resource_detector()
-    config = detector.detect_all_resources()
+    config = detector.detect_all_resources(use_cache=not args.no_cache)
     print(json.dumps(config.__dict__, indent=2))